@@ -0,0 +1,350 @@
+"""
+Headless recognition over recorded videos and image folders.
+
+Runs detector -> embedder -> recognizer with no GUI, spreading files (and
+segments of long videos) over a process pool, and streams one row per
+recognized face to a CSV or Parquet report.
+
+    python batch.py recordings/ photos/ --output report.csv --workers 4
+"""
+import argparse
+import csv
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mkv", ".mov", ".wmv", ".m4v"}
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+COLUMNS = ["source", "frame", "timestamp", "track", "name", "score", "x1", "y1", "x2", "y2"]
+
+
+# ---------------- TASKS ---------------- #
+
+def _expand(inputs):
+    """
+    Files under the given paths (directories are walked), sorted.
+    """
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for filename in sorted(files):
+                    yield os.path.join(root, filename)
+        else:
+            yield path
+
+
+def collect_tasks(inputs, segment_frames=3000, images_per_task=64):
+    """
+    Split the work into independent tasks:
+    ("video", path, first frame, end frame) or ("images", [paths]).
+    Long videos are cut into segments so one recording still uses every worker.
+    """
+    import cv2
+
+    tasks = []
+    images = []
+    for path in _expand(inputs):
+        ext = os.path.splitext(path)[1].lower()
+        if ext in IMAGE_EXTENSIONS:
+            images.append(path)
+        elif ext in VIDEO_EXTENSIONS:
+            cap = cv2.VideoCapture(path)
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            cap.release()
+            if frame_count <= 0:
+                # Unknown length (some containers): one task reads to the end
+                tasks.append(("video", path, 0, None))
+                continue
+            for start in range(0, frame_count, segment_frames):
+                tasks.append(("video", path, start, min(start + segment_frames, frame_count)))
+        else:
+            logging.debug(f"Skipping {path}")
+
+    for start in range(0, len(images), images_per_task):
+        tasks.append(("images", images[start:start + images_per_task]))
+    return tasks
+
+
+# ---------------- WORKER ---------------- #
+
+_worker = {}
+
+
+def load_gallery():
+    """
+    Open (or migrate) the embedding store once, in the parent process:
+    workers only read the shared gallery and never touch the store files.
+    Returns: SharedGallery of the recognizer's gallery matrix
+    """
+    from core.multicam import SharedGallery
+    from core.recognition import FaceRecognizer
+    from utils.storage import load_embeddings
+
+    labels, matrix = FaceRecognizer(load_embeddings()).gallery_matrix()
+    return SharedGallery(labels, matrix)
+
+
+def _init_worker(descriptor, threshold, precision, threads):
+    """
+    Load the models once per worker process and attach to the shared gallery.
+    """
+    import cv2
+    from core.face_detector import FaceDetector
+    from core.embedder import FaceEmbedder
+    from core.multicam import GalleryView
+
+    # Workers share the CPU; keep each one's own thread pools small
+    cv2.setNumThreads(threads)
+    _worker["detector"] = FaceDetector()
+    _worker["embedder"] = FaceEmbedder(precision=precision, intra_op_threads=threads)
+    _worker["gallery"] = GalleryView(descriptor)
+    _worker["threshold"] = threshold
+
+
+def _match(frame, boxes):
+    embeddings = _worker["embedder"].embed_faces(frame, boxes)
+    return _worker["gallery"].match(embeddings, _worker["threshold"])
+
+
+def _video_rows(path, start, end, frame_step):
+    import cv2
+    from core.tracker import FaceTracker
+
+    cap = cv2.VideoCapture(path)
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+
+    # Faces that stay in place keep their identity instead of being re-embedded
+    tracker = FaceTracker()
+    rows = []
+    frames = 0
+    index = start
+    while end is None or index < end:
+        if not cap.grab():
+            break
+        if (index - start) % frame_step == 0:
+            ok, frame = cap.retrieve()
+            if not ok:
+                break
+            frames += 1
+
+            tracks = tracker.update(_worker["detector"].detect(frame))
+            stale = [track for track in tracks if tracker.needs_embedding(track)]
+            if stale:
+                for track, (name, score) in zip(stale, _match(frame, [t.box for t in stale])):
+                    tracker.assign(track, name, score)
+
+            timestamp = round(index / fps, 3) if fps else None
+            for track in tracks:
+                if track not in stale:
+                    tracker.reuse(track)
+                rows.append([path, index, timestamp, track.id, track.name, round(float(track.score), 4), *track.box])
+        index += 1
+
+    cap.release()
+    return rows, frames
+
+
+def _image_rows(paths):
+    import cv2
+
+    rows = []
+    frames = 0
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            logging.warning(f"Cannot read image {path}")
+            continue
+        frames += 1
+
+        boxes = _worker["detector"].detect(frame)
+        if not boxes:
+            continue
+        for face, (box, (name, score)) in enumerate(zip(boxes, _match(frame, boxes))):
+            rows.append([path, 0, None, face, name, round(float(score), 4), *box])
+    return rows, frames
+
+
+def describe(task):
+    if task[0] == "video":
+        end = "end" if task[3] is None else task[3]
+        return f"{task[1]} [{task[2]}:{end}]"
+    return f"{len(task[1])} images from {os.path.dirname(task[1][0])}"
+
+
+def process_task(task, frame_step=1):
+    """
+    Runs in a worker process.
+    Returns: (report rows, frames processed, {stage: (count, seconds)} spent on this task)
+    """
+    from utils.metrics import registry
+
+    before = registry.totals()
+    if task[0] == "video":
+        rows, frames = _video_rows(task[1], task[2], task[3], frame_step)
+    else:
+        rows, frames = _image_rows(task[1])
+
+    stages = {}
+    for stage, (count, seconds) in registry.totals().items():
+        prev_count, prev_seconds = before.get(stage, (0, 0.0))
+        stages[stage] = (count - prev_count, seconds - prev_seconds)
+    return rows, frames, stages
+
+
+# ---------------- REPORT ---------------- #
+
+class ReportWriter:
+    """
+    Appends rows to a CSV file, or to a Parquet file in row groups.
+    """
+
+    def __init__(self, path, fmt=None, row_group_size=10000):
+        self.path = path
+        self.format = fmt or ("parquet" if path.endswith(".parquet") else "csv")
+        self.row_group_size = row_group_size
+        self.rows_written = 0
+        self._pending = []
+
+        if self.format == "parquet":
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)")
+            self._pa = pa
+            self._schema = pa.schema([
+                ("source", pa.string()), ("frame", pa.int64()), ("timestamp", pa.float64()),
+                ("track", pa.int64()), ("name", pa.string()), ("score", pa.float64()),
+                ("x1", pa.int64()), ("y1", pa.int64()), ("x2", pa.int64()), ("y2", pa.int64()),
+            ])
+            self._writer = pq.ParquetWriter(path, self._schema)
+        else:
+            self._file = open(path, "w", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(COLUMNS)
+
+    def write(self, rows):
+        self.rows_written += len(rows)
+        if self.format == "csv":
+            self._writer.writerows(rows)
+            self._file.flush()
+            return
+
+        self._pending.extend(rows)
+        if len(self._pending) >= self.row_group_size:
+            self._flush_parquet()
+
+    def _flush_parquet(self):
+        if not self._pending:
+            return
+        columns = list(zip(*self._pending))
+        table = self._pa.Table.from_arrays(
+            [self._pa.array(col, type=field.type) for col, field in zip(columns, self._schema)],
+            schema=self._schema,
+        )
+        self._writer.write_table(table)
+        self._pending = []
+
+    def close(self):
+        if self.format == "csv":
+            self._file.close()
+        else:
+            self._flush_parquet()
+            self._writer.close()
+
+
+def summarize(rows, summary):
+    """
+    Fold report rows into {name: [detections, first source, best score]}.
+    """
+    for row in rows:
+        name, score = row[4], row[5]
+        if name is None or name == "Unknown":
+            continue
+        entry = summary.setdefault(name, [0, row[0], score])
+        entry[0] += 1
+        entry[2] = max(entry[2], score)
+
+
+# ---------------- ENTRY ---------------- #
+
+def main():
+    parser = argparse.ArgumentParser(description="Recognize faces in recorded videos and image folders")
+    parser.add_argument("inputs", nargs="+", help="video files, images or directories")
+    parser.add_argument("--output", default="attendance_report.csv", help=".csv or .parquet")
+    parser.add_argument("--format", choices=("csv", "parquet"), help="override the output extension")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--frame-step", type=int, default=1, help="process every Nth video frame")
+    parser.add_argument("--segment-frames", type=int, default=3000, help="video frames per task")
+    parser.add_argument("--threshold", type=float, default=0.65)
+    parser.add_argument("--precision", choices=("fp32", "int8"), default="fp32")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    tasks = collect_tasks(args.inputs, segment_frames=args.segment_frames)
+    if not tasks:
+        parser.error("no videos or images found")
+    logging.info(f"{len(tasks)} tasks on {args.workers} workers")
+
+    from core.embedder import build_model_cache
+    # Workers would otherwise all write the optimized-model cache at once
+    build_model_cache(args.precision)
+
+    gallery = load_gallery()
+    writer = ReportWriter(args.output, args.format)
+    summary = {}
+    stages = {}
+    frames = 0
+    start = time.perf_counter()
+
+    # spawn: same start method as the camera workers, on every platform
+    try:
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(gallery.descriptor, args.threshold, args.precision, args.threads_per_worker),
+        ) as pool:
+            futures = {pool.submit(process_task, task, args.frame_step): task for task in tasks}
+            for done, future in enumerate(as_completed(futures), start=1):
+                task = futures[future]
+                try:
+                    rows, task_frames, task_stages = future.result()
+                except Exception as e:
+                    logging.error(f"Task on {describe(task)} failed: {e}")
+                    continue
+
+                # Rows are written as tasks finish, not held until the end
+                writer.write(rows)
+                summarize(rows, summary)
+                frames += task_frames
+                for stage, (count, seconds) in task_stages.items():
+                    total_count, total_seconds = stages.get(stage, (0, 0.0))
+                    stages[stage] = (total_count + count, total_seconds + seconds)
+                logging.info(f"[{done}/{len(tasks)}] {describe(task)}")
+    finally:
+        gallery.close()
+
+    writer.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"{frames} frames in {elapsed:.1f} s ({frames / max(elapsed, 1e-9):.1f} frames/s), "
+          f"{writer.rows_written} rows -> {args.output}")
+    for stage, (count, seconds) in sorted(stages.items()):
+        if count:
+            print(f"  {stage:<12} {count:>8} calls  {seconds / count * 1000:8.2f} ms avg  {seconds:8.1f} s total")
+    for name, (detections, source, best) in sorted(summary.items()):
+        print(f"  {name:<24} {detections:>6} detections  best {best:.2f}  first seen in {source}")
+
+
+if __name__ == "__main__":
+    # Needed for worker processes in the frozen EXE
+    multiprocessing.freeze_support()
+    main()
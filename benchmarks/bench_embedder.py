@@ -0,0 +1,44 @@
+"""
+Per-face latency of FaceEmbedder: one call per face vs one batched call.
+
+Run from the project root:
+    python -m benchmarks.bench_embedder
+"""
+import time
+import numpy as np
+from core.embedder import FaceEmbedder
+
+BATCH_SIZES = (1, 8, 32)
+REPEATS = 10
+
+
+def time_call(fn, repeats=REPEATS):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    embedder = FaceEmbedder()
+    rng = np.random.default_rng(0)
+
+    print(f"{'N':>4} {'per-face loop (ms)':>20} {'batched (ms)':>14} {'speedup':>8}")
+    for n in BATCH_SIZES:
+        faces = rng.integers(0, 256, size=(n, 160, 160, 3), dtype=np.uint8)
+
+        def loop():
+            for face in faces:
+                embedder.get_embedding(face[np.newaxis])
+
+        def batched():
+            embedder.get_embeddings_batch(faces)
+
+        loop_ms = time_call(loop) / n * 1000
+        batch_ms = time_call(batched) / n * 1000
+        print(f"{n:>4} {loop_ms:>20.2f} {batch_ms:>14.2f} {loop_ms / batch_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Cost of one enrollment or delete: incremental gallery updates
+(add_samples / remove_identity) vs rebuilding the recognizer from the db.
+
+Run from the project root:
+    python -m benchmarks.bench_gallery --identities 2000 --templates 8
+"""
+import argparse
+import numpy as np
+from benchmarks.harness import measure, format_row
+from core.index import l2_normalize
+from core.recognition import FaceRecognizer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--identities", type=int, default=2000)
+    parser.add_argument("--templates", type=int, default=8)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    db = {
+        f"id{i}": list(rng.standard_normal((args.templates, args.dim)).astype(np.float32))
+        for i in range(args.identities)
+    }
+    new = l2_normalize(rng.standard_normal((args.templates, args.dim)).astype(np.float32))
+    print(f"{args.identities} identities x {args.templates} templates")
+
+    for index_type in ("mean", "flat"):
+        # index_path=None: measure the in-memory update, not the index file write
+        recognizer = FaceRecognizer(dict(db), index_type=index_type, index_path=None)
+
+        def incremental():
+            recognizer.add_samples("newcomer", new)
+            recognizer.remove_identity("newcomer")
+
+        def rebuild():
+            FaceRecognizer(dict(db, newcomer=list(new)), index_type=index_type, index_path=None)
+
+        print(format_row(f"{index_type}/add+remove", measure(incremental, repeats=args.repeats)))
+        print(format_row(f"{index_type}/rebuild", measure(rebuild, repeats=3, warmup=1)))
+
+
+if __name__ == "__main__":
+    main()
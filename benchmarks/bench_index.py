@@ -0,0 +1,73 @@
+"""
+Recall and latency of the approximate IVF index against exact flat search
+over every enrollment template.
+
+Run from the project root:
+    python -m benchmarks.bench_index --identities 10000 --templates 20
+"""
+import argparse
+import time
+import numpy as np
+from core.index import FlatIndex, IVFIndex, l2_normalize
+
+
+def synthetic_gallery(identities, templates, dim, rng):
+    """
+    Each identity is a random direction; its templates are noisy copies.
+    Returns: (labels, vectors, queries, query_labels)
+    """
+    centers = l2_normalize(rng.standard_normal((identities, dim)))
+    vectors = np.repeat(centers, templates, axis=0)
+    vectors += 1.2 * rng.standard_normal(vectors.shape) / np.sqrt(dim)
+    labels = np.repeat(np.array([f"id{i}" for i in range(identities)], dtype=object), templates)
+
+    picks = rng.choice(identities, size=min(1000, identities), replace=False)
+    queries = centers[picks] + 1.2 * rng.standard_normal((len(picks), dim)) / np.sqrt(dim)
+    return labels, vectors, l2_normalize(queries), labels[picks * templates]
+
+
+def timed_search(index, queries):
+    """
+    One query at a time, as the camera loop issues them.
+    Returns: (top-1 labels, ms per query)
+    """
+    found = []
+    start = time.perf_counter()
+    for query in queries:
+        _, labels = index.search(query[None, :], 1)
+        found.append(labels[0, 0])
+    elapsed = time.perf_counter() - start
+    return np.array(found, dtype=object), elapsed / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--identities", type=int, default=2000)
+    parser.add_argument("--templates", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=512)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    labels, vectors, queries, truth = synthetic_gallery(
+        args.identities, args.templates, args.dim, rng
+    )
+    print(f"{len(vectors)} templates, {len(queries)} queries")
+
+    flat = FlatIndex()
+    flat.add(labels, vectors)
+    exact, flat_ms = timed_search(flat, queries)
+    print(f"flat          recall@1 vs truth {np.mean(exact == truth):.3f}  {flat_ms:.3f} ms/query")
+
+    ivf = IVFIndex()
+    start = time.perf_counter()
+    ivf.add(labels, vectors)
+    print(f"ivf build     {time.perf_counter() - start:.2f} s, {len(ivf.centroids)} lists")
+
+    for nprobe in (1, 4, 8, 16, 32):
+        ivf.nprobe = nprobe
+        found, ivf_ms = timed_search(ivf, queries)
+        print(f"ivf nprobe={nprobe:<3} recall@1 vs flat {np.mean(found == exact):.3f}  {ivf_ms:.3f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
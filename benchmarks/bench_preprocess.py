@@ -0,0 +1,83 @@
+"""
+Face preprocessing cost: the old crop -> resize -> stack -> normalize path
+vs FacePreprocessor writing into a reused input buffer. Reports
+microseconds per face and heap allocations per call (tracemalloc sees
+numpy buffers, including the arrays OpenCV returns).
+
+Run from the project root:
+    python -m benchmarks.bench_preprocess --faces 1 8 32
+"""
+import argparse
+import tracemalloc
+import cv2
+import numpy as np
+from benchmarks.harness import measure
+from benchmarks.stubs import synthetic_frame
+from core.embedder import FacePreprocessor
+from core.face_detector import clip_boxes
+
+
+def legacy_preprocess(frame, boxes, size=160):
+    # What CameraThread did before: a new array per crop, per stack, per normalize
+    faces = [cv2.resize(frame[y1:y2, x1:x2], (size, size)) for (x1, y1, x2, y2) in boxes]
+    batch = np.stack(faces)
+    return (batch.astype(np.float32) - 127.5) / 128.0
+
+
+def random_boxes(rng, n, width, height):
+    boxes = []
+    for _ in range(n):
+        side = int(rng.integers(60, 200))
+        x1 = int(rng.integers(-20, width - 40))
+        y1 = int(rng.integers(-20, height - 40))
+        boxes.append((x1, y1, x1 + side, y1 + side))
+    return clip_boxes(boxes, width, height)
+
+
+def count_peak(fn, calls=20):
+    """
+    Returns: peak traced bytes across calls, i.e. the temporaries a call
+    allocates even when they are freed before it returns
+    """
+    fn()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    for _ in range(calls):
+        fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frame = synthetic_frame(rng)
+    height, width = frame.shape[:2]
+    preprocessor = FacePreprocessor(capacity=max(args.faces))
+    inputs = np.empty((max(args.faces),) + preprocessor.shape, dtype=np.float32)
+
+    print(f"{'N':>4} {'path':<14} {'us/face':>9} {'peak KiB':>10}")
+    for n in args.faces:
+        boxes = random_boxes(rng, n, width, height)
+        paths = {
+            "legacy": lambda: legacy_preprocess(frame, boxes),
+            "preallocated": lambda: preprocessor(frame, boxes, inputs),
+        }
+
+        reference = legacy_preprocess(frame, boxes)
+        assert np.allclose(reference, preprocessor(frame, boxes, inputs), atol=1e-6)
+
+        for name, fn in paths.items():
+            stats = measure(fn, repeats=args.repeats, items=len(boxes))
+            us = stats["mean_ms"] * 1000 / len(boxes)
+            peak = count_peak(fn) / 1024
+            print(f"{len(boxes):>4} {name:<14} {us:>9.1f} {peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
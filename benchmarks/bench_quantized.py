@@ -0,0 +1,114 @@
+"""
+INT8 vs fp32 embedder: embedding drift, rank-1 agreement against the
+enrolled gallery and per-face speedup.
+
+Create the INT8 model first (python -m core.quantize), then run from the
+project root:
+    python -m benchmarks.bench_quantized
+"""
+import argparse
+import json
+import numpy as np
+from benchmarks.harness import measure, format_row
+from core.embedder import FaceEmbedder
+from core.index import l2_normalize
+from core.recognition import FaceRecognizer
+from utils.storage import load_embeddings, load_enrollment_crops
+
+
+def labeled_crops(max_crops, rng):
+    """
+    Returns: (uint8 crops, owner name per crop); random faces when nobody
+    has stored crops yet
+    """
+    per_person = load_enrollment_crops()
+    if not per_person:
+        print("No enrollment crops stored; using random faces (agreement is not meaningful)")
+        return rng.integers(0, 256, size=(max_crops, 160, 160, 3), dtype=np.uint8), [None] * max_crops
+
+    crops = np.concatenate(list(per_person.values()))
+    owners = [name for name, faces in per_person.items() for _ in range(len(faces))]
+    if len(crops) > max_crops:
+        keep = rng.choice(len(crops), max_crops, replace=False)
+        crops, owners = crops[keep], [owners[i] for i in keep]
+    return crops, owners
+
+
+def drift(reference, candidate):
+    """
+    Cosine similarity of each INT8 embedding to its fp32 counterpart.
+    """
+    cosine = np.sum(l2_normalize(reference) * l2_normalize(candidate), axis=1)
+    return {
+        "cosine_mean": float(cosine.mean()),
+        "cosine_p5": float(np.percentile(cosine, 5)),
+        "cosine_min": float(cosine.min()),
+    }
+
+
+def rank1(recognizer, embeddings):
+    return [recognizer.decide(candidates)[0] for candidates in recognizer.recognize_batch(embeddings)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-crops", type=int, default=500)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 8, 32], help="batch sizes to time")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    crops, owners = labeled_crops(args.max_crops, rng)
+    embedders = {
+        "fp32": FaceEmbedder(),
+        "int8": FaceEmbedder(precision="int8"),
+    }
+    embeddings = {
+        precision: embedder.get_embeddings_batch(crops)
+        for precision, embedder in embedders.items()
+    }
+
+    results = {"faces": len(crops), "drift": drift(embeddings["fp32"], embeddings["int8"])}
+
+    db = load_embeddings()
+    if db:
+        recognizer = FaceRecognizer(db)
+        names = {precision: rank1(recognizer, e) for precision, e in embeddings.items()}
+        agree = np.mean([a == b for a, b in zip(names["fp32"], names["int8"])])
+        results["rank1_agreement"] = float(agree)
+        if owners[0] is not None:
+            for precision, predicted in names.items():
+                results[f"rank1_accuracy_{precision}"] = float(
+                    np.mean([p == o for p, o in zip(predicted, owners)])
+                )
+
+    timings = {}
+    for n in args.sizes:
+        faces = crops[:n] if len(crops) >= n else rng.integers(0, 256, size=(n, 160, 160, 3), dtype=np.uint8)
+        for precision, embedder in embedders.items():
+            timings[f"{precision}/batch={n}"] = measure(
+                lambda: embedder.get_embeddings_batch(faces), repeats=args.repeats, items=n
+            )
+        results[f"speedup/batch={n}"] = (
+            timings[f"fp32/batch={n}"]["mean_ms"] / timings[f"int8/batch={n}"]["mean_ms"]
+        )
+    results["timings"] = timings
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"faces compared: {results['faces']}")
+    print("drift (cosine to fp32): " + "  ".join(f"{k} {v:.4f}" for k, v in results["drift"].items()))
+    for key in ("rank1_agreement", "rank1_accuracy_fp32", "rank1_accuracy_int8"):
+        if key in results:
+            print(f"{key}: {results[key]:.3f}")
+    for name, stats in timings.items():
+        print(format_row(name, stats))
+    for n in args.sizes:
+        print(f"speedup per face, batch={n}: {results[f'speedup/batch={n}']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Command latency of the persistent SerialController against a pty fake
+board, vs the old open-sleep-write-close per command.
+
+Run from the project root (POSIX):
+    python -m benchmarks.bench_serial
+"""
+import argparse
+import time
+import serial
+from benchmarks.fake_serial import FakeArduino
+from benchmarks.harness import measure, format_row
+from utils.serial_controller import SerialController
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--reset-delay", type=float, default=2.0, help="board reset wait of the old path")
+    args = parser.parse_args()
+
+    device = FakeArduino()
+    controller = SerialController(port=device.port, reset_delay=0.0)
+
+    def persistent():
+        controller.send("START").result(timeout=5)
+
+    def reopen():
+        # What send_start_signal did before: reopen and wait for the reset every time
+        with serial.Serial(device.port, 9600, timeout=1) as ser:
+            time.sleep(args.reset_delay)
+            ser.write(b"START\n")
+            ser.flush()
+
+    print(format_row("serial/persistent", measure(persistent, repeats=args.repeats)))
+    print(format_row("serial/reopen", measure(reopen, repeats=3, warmup=0)))
+
+    controller.close()
+    device.unplug()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+FaceEmbedder startup time and per-inference latency: default ONNX Runtime
+session vs tuned session (cached optimized model, IO binding).
+
+Run from the project root:
+    python -m benchmarks.bench_session --intra-op-threads 2
+"""
+import argparse
+import os
+import time
+import numpy as np
+from benchmarks.harness import measure, format_row
+from core.embedder import FaceEmbedder
+
+
+def timed_load(**kwargs):
+    start = time.perf_counter()
+    embedder = FaceEmbedder(**kwargs)
+    return embedder, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--intra-op-threads", type=int)
+    parser.add_argument("--inter-op-threads", type=int)
+    parser.add_argument("--execution-mode", default="sequential")
+    parser.add_argument("--graph-optimization", default="all")
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    tuned = dict(
+        intra_op_threads=args.intra_op_threads,
+        inter_op_threads=args.inter_op_threads,
+        execution_mode=args.execution_mode,
+        graph_optimization=args.graph_optimization,
+    )
+
+    baseline, baseline_ms = timed_load(cache_optimized_model=False, use_io_binding=False)
+
+    # Start the tuned run from a cold cache
+    baseline.graph_optimization = args.graph_optimization
+    cached_path = baseline._optimized_model_path()
+    if os.path.exists(cached_path):
+        os.remove(cached_path)
+    _, cold_ms = timed_load(**tuned)
+    optimized, warm_ms = timed_load(**tuned)
+
+    print(f"startup  default {baseline_ms:8.1f} ms")
+    print(f"startup  tuned, first run (optimize + save) {cold_ms:8.1f} ms")
+    print(f"startup  tuned, cached optimized model {warm_ms:8.1f} ms")
+
+    rng = np.random.default_rng(0)
+    for n in (1, 8):
+        faces = rng.integers(0, 256, size=(n, 160, 160, 3), dtype=np.uint8)
+        for name, embedder in (("default", baseline), ("tuned", optimized)):
+            stats = measure(lambda: embedder.get_embeddings_batch(faces), repeats=args.repeats, items=n)
+            print(format_row(f"infer {name} batch={n}", stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+pty-backed stand-in for the Arduino, so SerialController can be exercised
+without hardware (POSIX only). Pass `device.port` as SerialController's
+port: a stable symlink to the current pty, like /dev/serial/by-id.
+"""
+import os
+import select
+import tempfile
+import threading
+import time
+import tty
+
+
+class FakeArduino:
+    """
+    Answers every command line with "ACK <command>" after `latency` seconds.
+    silent: never answer (like the stock sketch)
+    """
+
+    def __init__(self, latency=0.0, silent=False):
+        self.latency = latency
+        self.silent = silent
+        self.received = []
+        self.port = os.path.join(tempfile.mkdtemp(prefix="fake-arduino-"), "ttyACM0")
+        self._plug()
+
+    def _plug(self):
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        if os.path.lexists(self.port):
+            os.remove(self.port)
+        os.symlink(os.ttyname(self._slave), self.port)
+
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        buffer = b""
+        while not self._stop_event.is_set():
+            ready, _, _ = select.select([self._master], [], [], 0.05)
+            if not ready:
+                continue
+            try:
+                buffer += os.read(self._master, 1024)
+            except OSError:
+                break
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                command = line.decode().strip()
+                self.received.append(command)
+                if not self.silent:
+                    if self.latency:
+                        time.sleep(self.latency)
+                    os.write(self._master, f"ACK {command}\n".encode())
+
+    def unplug(self):
+        """
+        Close both pty ends and remove the port; the controller sees I/O
+        errors until replug().
+        """
+        self._stop_event.set()
+        self._thread.join()
+        os.close(self._master)
+        os.close(self._slave)
+        os.remove(self.port)
+
+    def replug(self):
+        """
+        A fresh pty behind the same port path.
+        """
+        self._plug()
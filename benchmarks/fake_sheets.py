@@ -0,0 +1,164 @@
+"""
+In-memory stand-in for the parts of gspread AttendanceManager uses, so the
+attendance path can be exercised without network or credentials.
+"""
+import re
+import time
+
+
+def _a1_to_rowcol(label):
+    match = re.fullmatch(r"([A-Z]+)(\d+)", label)
+    col = 0
+    for ch in match.group(1):
+        col = col * 26 + ord(ch) - 64
+    return int(match.group(2)), col
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, values, sheet_id=0, grid_rows=None):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self.values = [list(row) for row in values]
+        # row_count is gspread's cached grid size from the fetch; grid_rows
+        # is the real one, grown by appends and appendDimension
+        self.row_count = max(1000, len(values)) if grid_rows is None else grid_rows
+        self.grid_rows = self.row_count
+
+    def _call(self, name):
+        self.spreadsheet.client.calls[name] = self.spreadsheet.client.calls.get(name, 0) + 1
+        if self.spreadsheet.client.latency:
+            time.sleep(self.spreadsheet.client.latency)
+
+    def _set(self, row, col, value):
+        if row > self.grid_rows:
+            raise ValueError(f"Row {row} is outside the grid ({self.grid_rows} rows)")
+        while len(self.values) < row:
+            self.values.append([])
+        cells = self.values[row - 1]
+        if len(cells) < col:
+            cells.extend([""] * (col - len(cells)))
+        cells[col - 1] = value
+
+    def _column(self, col, first_row):
+        column = [
+            [cells[col - 1]] if len(cells) >= col and cells[col - 1] != "" else []
+            for cells in self.values[first_row - 1:]
+        ]
+        while column and not column[-1]:
+            column.pop()
+        return column
+
+    def _write_range(self, a1_range, rows):
+        row, col = _a1_to_rowcol(a1_range.split("!")[-1].split(":")[0])
+        for i, cells in enumerate(rows):
+            for j, value in enumerate(cells):
+                self._set(row + i, col + j, value)
+
+    def get_all_values(self):
+        # Like gspread: every row padded to the widest one
+        self._call("get_all_values")
+        width = max((len(row) for row in self.values), default=0)
+        return [list(row) + [""] * (width - len(row)) for row in self.values]
+
+    def batch_get(self, ranges):
+        # Like the Sheets API: rows come back without trailing empty cells
+        self._call("batch_get")
+        result = []
+        for a1_range in ranges:
+            if re.fullmatch(r"\d+:\d+", a1_range):
+                row = int(a1_range.split(":")[0])
+                cells = list(self.values[row - 1]) if row <= len(self.values) else []
+                while cells and cells[-1] == "":
+                    cells.pop()
+                result.append([cells] if cells else [])
+            else:
+                first, _ = a1_range.split(":")
+                row, col = _a1_to_rowcol(first)
+                result.append(self._column(col, row))
+        return result
+
+    def batch_update(self, data, value_input_option=None):
+        self._call("batch_update")
+        for item in data:
+            self._write_range(item["range"], item["values"])
+
+    def update_cell(self, row, col, value):
+        self._call("update_cell")
+        self._set(row, col, value)
+
+    def append_row(self, values, table_range=None, value_input_option=None):
+        self._call("append_row")
+        self.values.append(list(values))
+        self.grid_rows = max(self.grid_rows, len(self.values))
+
+    def append_rows(self, values, table_range=None, value_input_option=None):
+        self._call("append_rows")
+        self.values.extend(list(row) for row in values)
+        self.grid_rows = max(self.grid_rows, len(self.values))
+
+
+class FakeSpreadsheet:
+    def __init__(self, client, worksheets):
+        self.client = client
+        self.worksheets = worksheets
+
+    def worksheet(self, title):
+        from gspread.exceptions import WorksheetNotFound
+        if title not in self.worksheets:
+            raise WorksheetNotFound(title)
+        return self.worksheets[title]
+
+    def batch_update(self, body):
+        self.client.calls["spreadsheet.batch_update"] = self.client.calls.get("spreadsheet.batch_update", 0) + 1
+        for request in body["requests"]:
+            if "appendDimension" in request:
+                grow = request["appendDimension"]
+                self.client.appended_rows += grow["length"]
+                for sheet in self.worksheets.values():
+                    if sheet.id == grow["sheetId"]:
+                        sheet.grid_rows += grow["length"]
+
+    def values_batch_update(self, body):
+        self.client.calls["values_batch_update"] = self.client.calls.get("values_batch_update", 0) + 1
+        for item in body["data"]:
+            title = item["range"].split("!")[0].strip("'").replace("''", "'")
+            self.worksheets[title]._write_range(item["range"], item["values"])
+
+
+class FakeClient:
+    """
+    Every spreadsheet key opens the same set of worksheets, each a copy of
+    `values`. latency: seconds slept per API call to mimic the network.
+    grid_rows: grid size of each worksheet (default: at least 1000 rows)
+    """
+
+    def __init__(self, worksheet_titles, values, latency=0.0, grid_rows=None):
+        self.latency = latency
+        self.grid_rows = grid_rows
+        self.calls = {}
+        self.appended_rows = 0  # grid rows added through appendDimension
+        self._titles = worksheet_titles
+        self._values = values
+        self._spreadsheets = {}
+
+    def open_by_key(self, key):
+        if key not in self._spreadsheets:
+            spreadsheet = FakeSpreadsheet(self, {})
+            for i, title in enumerate(self._titles):
+                spreadsheet.worksheets[title] = FakeWorksheet(
+                    spreadsheet, title, self._values, i, self.grid_rows
+                )
+            self._spreadsheets[key] = spreadsheet
+        return self._spreadsheets[key]
+
+
+def attendance_sheet(students, dates):
+    """
+    Values of a sheet laid out like the real ones: title row, date header
+    row starting at column C, then one row per student.
+    """
+    values = [["Attendance"], ["Sl No", "Name"] + list(dates)]
+    for i, name in enumerate(students, start=1):
+        values.append([str(i), name] + [""] * len(dates))
+    return values
@@ -0,0 +1,37 @@
+import time
+import numpy as np
+
+
+def measure(fn, repeats=50, warmup=3, items=1):
+    """
+    Time fn() repeatedly.
+    items: units of work per call (e.g. faces), for throughput
+    Returns: dict of p50/p95/mean latency in ms and items per second
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    samples = np.array(samples) * 1000
+    return {
+        "calls": repeats,
+        "items_per_call": items,
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "mean_ms": float(samples.mean()),
+        "throughput_per_s": float(items * 1000 / samples.mean()),
+    }
+
+
+def format_row(name, stats):
+    if "skipped" in stats:
+        return f"{name:<32} skipped: {stats['skipped']}"
+    return (
+        f"{name:<32} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  "
+        f"{stats['throughput_per_s']:12.1f} items/s"
+    )
@@ -0,0 +1,161 @@
+"""
+Headless benchmark of the recognition pipeline stages on synthetic data.
+
+Run from the project root:
+    python -m benchmarks.run --stub-model --json bench.json
+    python -m benchmarks.run --stages recognize --sizes 100,1000,10000,50000
+"""
+import argparse
+import json
+import os
+import platform
+import time
+from datetime import datetime
+import numpy as np
+
+from benchmarks.harness import measure, format_row
+from benchmarks.stubs import StubSession, synthetic_frame, synthetic_db
+
+STAGES = ("detect", "embed", "recognize", "attendance")
+
+
+def bench_detect(args, rng):
+    from utils.paths import MODEL
+    if not os.path.exists(MODEL):
+        return {"detect": {"skipped": f"detector weights not found at {MODEL}"}}
+
+    from core.face_detector import FaceDetector
+    detector = FaceDetector()
+    frame = synthetic_frame(rng)
+    return {"detect": measure(lambda: detector.detect(frame), repeats=args.repeats)}
+
+
+def bench_embed(args, rng):
+    from core.embedder import FaceEmbedder
+    embedder = FaceEmbedder(session=StubSession() if args.stub_model else None)
+
+    results = {}
+    for n in (1, 8, 32):
+        faces = rng.integers(0, 256, size=(n, 160, 160, 3), dtype=np.uint8)
+        results[f"embed/batch={n}"] = measure(
+            lambda: embedder.get_embeddings_batch(faces), repeats=args.repeats, items=n
+        )
+    return results
+
+
+def bench_recognize(args, rng):
+    from core.recognition import FaceRecognizer
+
+    results = {}
+    for size in args.sizes:
+        db = synthetic_db(rng, size, templates=args.templates)
+        queries = rng.standard_normal((8, 512)).astype(np.float32)
+
+        for index_type in args.index_types:
+            start = time.perf_counter()
+            recognizer = FaceRecognizer(db, index_type=index_type, index_path=None)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            stats = measure(lambda: recognizer.recognize(queries[0]), repeats=args.repeats)
+            stats["build_ms"] = build_ms
+            results[f"recognize/{index_type}/n={size}"] = stats
+            results[f"recognize_batch8/{index_type}/n={size}"] = measure(
+                lambda: recognizer.recognize_batch(queries), repeats=args.repeats, items=len(queries)
+            )
+
+            # Period session, faces on the roster: only the class is searched
+            # (random queries match nobody, so the fallback is left out)
+            recognizer.set_roster(list(db)[:args.roster], fallback=False)
+            results[f"recognize_batch8/{index_type}/n={size}/roster={args.roster}"] = measure(
+                lambda: recognizer.recognize_batch(queries), repeats=args.repeats, items=len(queries)
+            )
+    return results
+
+
+def bench_attendance(args, rng):
+    from benchmarks.fake_sheets import FakeClient, attendance_sheet
+    from core.attendance import AttendanceManager
+    from utils.journal import AttendanceJournal
+
+    now = datetime.now()
+    sheet_name = f"{now.strftime('%B')}-{'First' if now.day <= 15 else 'Second'}"
+    students = [f"student{i:05d}" for i in range(args.students)]
+    client = FakeClient([sheet_name], attendance_sheet(students, [now.strftime("%d-%m-%Y")]),
+                        latency=args.sheet_latency)
+
+    manager = AttendanceManager(
+        cooldown_seconds=0, client=client, flush_interval=3600,
+        journal=AttendanceJournal(":memory:"),
+    )
+    manager.start_session("Period-1")
+
+    names = iter(students)
+    mark = measure(lambda: manager.mark_attendance(next(names)),
+                   repeats=len(students) - 3, warmup=3)
+
+    start = time.perf_counter()
+    manager.flush()
+    flush_ms = (time.perf_counter() - start) * 1000
+    manager.close()
+
+    return {
+        "attendance/mark": mark,
+        "attendance/flush": {
+            "calls": 1,
+            "items_per_call": len(students),
+            "p50_ms": flush_ms,
+            "p95_ms": flush_ms,
+            "mean_ms": flush_ms,
+            "throughput_per_s": len(students) * 1000 / flush_ms,
+            "api_calls": dict(client.calls),
+        },
+    }
+
+
+BENCHES = {
+    "detect": bench_detect,
+    "embed": bench_embed,
+    "recognize": bench_recognize,
+    "attendance": bench_attendance,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--stub-model", action="store_true", help="use a stub ONNX session for the embedder")
+    parser.add_argument("--sizes", default="100,1000,10000,50000", help="gallery sizes (identities)")
+    parser.add_argument("--templates", type=int, default=1, help="templates per identity")
+    parser.add_argument("--index-types", default="mean", help="comma-separated: mean,flat,ivf")
+    parser.add_argument("--roster", type=int, default=60, help="class size for the roster-scoped recognize bench")
+    parser.add_argument("--students", type=int, default=60, help="students marked in the attendance bench")
+    parser.add_argument("--sheet-latency", type=float, default=0.0, help="fake Sheets seconds per API call")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--json", help="write machine-readable results to this file")
+    args = parser.parse_args()
+
+    args.sizes = [int(s) for s in args.sizes.split(",")]
+    args.index_types = args.index_types.split(",")
+    rng = np.random.default_rng(0)
+
+    results = {}
+    for stage in args.stages.split(","):
+        for name, stats in BENCHES[stage](args, rng).items():
+            results[name] = stats
+            print(format_row(name, stats))
+
+    if args.json:
+        report = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "args": {k: v for k, v in vars(args).items() if k != "json"},
+            "results": results,
+        }
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
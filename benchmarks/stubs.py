@@ -0,0 +1,35 @@
+"""
+Stand-ins for the ONNX session so the pipeline can be timed without the
+FaceNet model file.
+"""
+from types import SimpleNamespace
+import numpy as np
+
+
+class StubSession:
+    """
+    Mimics onnxruntime.InferenceSession for FaceEmbedder: a fixed random
+    projection of a downsampled face, (N, 160, 160, 3) -> (N, dim).
+    """
+
+    def __init__(self, dim=512, seed=0):
+        rng = np.random.default_rng(seed)
+        self.weights = rng.standard_normal((20 * 20 * 3, dim)).astype(np.float32)
+
+    def get_inputs(self):
+        return [SimpleNamespace(name="input", shape=["N", 160, 160, 3])]
+
+    def run(self, output_names, feeds):
+        faces = feeds["input"][:, ::8, ::8, :]
+        return [faces.reshape(len(faces), -1) @ self.weights]
+
+
+def synthetic_frame(rng, width=640, height=480):
+    return rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+
+
+def synthetic_db(rng, identities, templates=1, dim=512):
+    return {
+        f"student{i:05d}": list(rng.standard_normal((templates, dim)).astype(np.float32))
+        for i in range(identities)
+    }
@@ -1,10 +1,13 @@
 import gspread
-from google.oauth2.service_account import Credentials
-from datetime import datetime
+from gspread.utils import rowcol_to_a1
+from datetime import datetime, timedelta
 import os
 import time
 import logging
-from utils.storage import load_embeddings
+import threading
+from utils.storage import enrolled_names
+from utils.journal import AttendanceJournal
+from utils.metrics import registry
 
 PERIOD_SHEETS = {
     "Period-1": "1OA1YZiZ2FdvEkJapimsoYy8mKe-jWSMj5uidKlMKeJk",
@@ -15,14 +18,243 @@ PERIOD_SHEETS = {
     "Period-6": "183RtCmveFRXZRs8z4cvaergYGxCZFAh-Fj7gP4iQiQw",
 }
 
+def _half_month_sheet(date_str):
+    """
+    Worksheet name holding a date, e.g. '17-10-2026' -> 'October-Second'.
+    """
+    day = datetime.strptime(date_str, "%d-%m-%Y")
+    suffix = "First" if day.day <= 15 else "Second"
+    return f"{day.strftime('%B')}-{suffix}"
+
+
+def _next_rollover(now):
+    """
+    Start of the next half-month (the 16th or the 1st of next month).
+    """
+    if now.day < 16:
+        return now.replace(day=16, hour=0, minute=0, second=0, microsecond=0)
+    first = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return (first + timedelta(days=32)).replace(day=1)
+
+
+def _strip_trailing(cells):
+    """
+    cells without their trailing empty strings.
+    """
+    end = len(cells)
+    while end and cells[end - 1] == "":
+        end -= 1
+    return list(cells[:end])
+
+
+def _validation_copy_request(sheet, first_row, num_rows, width):
+    """
+    copyPaste request that copies data validation from the row above
+    first_row (1-based) onto num_rows new rows.
+    """
+    return {
+        "copyPaste": {
+            "source": {
+                "sheetId": sheet.id,
+                "startRowIndex": first_row - 2,
+                "endRowIndex": first_row - 1,
+                "startColumnIndex": 2,  # Dates start at col index 3 (0-based is 2)
+                "endColumnIndex": width
+            },
+            "destination": {
+                "sheetId": sheet.id,
+                "startRowIndex": first_row - 1,
+                "endRowIndex": first_row - 1 + num_rows,
+                "startColumnIndex": 2,
+                "endColumnIndex": width
+            },
+            "pasteType": "PASTE_DATA_VALIDATION"
+        }
+    }
+
+
+def _sheet_range(sheet, a1_range):
+    """
+    Qualify an A1 range with the worksheet title for spreadsheet-level calls.
+    """
+    title = sheet.title.replace("'", "''")
+    return f"'{title}'!{a1_range}"
+
+
+class SheetLayout:
+    """
+    Snapshot of an attendance worksheet, read once per session:
+    Row 2 holds the dates, column B (Row 3 onwards) the student names.
+    Writes made through the manager are applied to the snapshot in place.
+    """
+    FIRST_STUDENT_ROW = 3
+
+    def __init__(self, sheet):
+        self.sheet = sheet
+        # gspread caches the grid size from when the worksheet was fetched;
+        # kept current here as rows are appended
+        self.row_count = getattr(sheet, "row_count", 0)
+        self.reload()
+
+    def reload(self):
+        self._load(self.sheet.get_all_values())
+
+    def _load(self, all_values):
+        self.values = all_values
+        self.headers = all_values[1] if len(all_values) >= 2 else []
+
+        self.date_cols = {}  # {date_str: 1-based column}
+        for col, header in enumerate(self.headers, start=1):
+            self.date_cols.setdefault(header, col)
+
+        self.rows = {}  # {student_name: 1-based row}
+        for row_num, row_data in enumerate(all_values[2:], start=self.FIRST_STUDENT_ROW):
+            if len(row_data) >= 2 and row_data[1].strip():
+                self.rows.setdefault(row_data[1].strip(), row_num)
+
+        self.next_row = len(all_values) + 1
+        self.row_count = max(self.row_count, len(all_values))
+        self.stale = False
+
+    @property
+    def width(self):
+        return len(self.headers)
+
+    def cell(self, row_num, col_idx):
+        row_data = self.values[row_num - 1] if row_num <= len(self.values) else []
+        return row_data[col_idx - 1] if col_idx <= len(row_data) else ""
+
+    def set_cell(self, row_num, col_idx, value):
+        while len(self.values) < row_num:
+            self.values.append([])
+        row_data = self.values[row_num - 1]
+        if len(row_data) < col_idx:
+            row_data.extend([""] * (col_idx - len(row_data)))
+        row_data[col_idx - 1] = value
+
+    def append_row(self, row_data):
+        """
+        Record a row appended at the bottom of the sheet.
+        Returns: its 1-based row number
+        """
+        row_num = self.next_row
+        while len(self.values) < row_num:
+            self.values.append([])
+        self.values[row_num - 1] = list(row_data)
+        self.rows.setdefault(row_data[1].strip(), row_num)
+        self.next_row += 1
+        # Appends and appendDimension grow the grid to cover the new row
+        self.row_count = max(self.row_count, row_num)
+        return row_num
+
+    def _names_column(self):
+        names = [
+            row_data[1].strip() if len(row_data) >= 2 else ""
+            for row_data in self.values[self.FIRST_STUDENT_ROW - 1:]
+        ]
+        return _strip_trailing(names)
+
+    def revalidate(self, date_str):
+        """
+        Cheap consistency check with a single request: re-read the header row,
+        the names column and the date column. If rows or headers were edited
+        by hand the whole snapshot is reloaded, otherwise only the date column
+        (which teachers may fill in manually) is refreshed.
+        """
+        col_idx = self.date_cols.get(date_str)
+        if self.stale or col_idx is None:
+            self.reload()
+            return
+
+        col = rowcol_to_a1(1, col_idx)[:-1]
+        first = self.FIRST_STUDENT_ROW
+        headers, names, marks = self.sheet.batch_get(
+            ["2:2", f"B{first}:B", f"{col}{first}:{col}"]
+        )
+
+        # The API drops trailing empty cells that get_all_values pads back
+        headers = _strip_trailing(headers[0] if headers else [])
+        names = _strip_trailing([r[0].strip() if r else "" for r in names])
+
+        if headers != _strip_trailing(self.headers) or names != self._names_column():
+            logging.info("Sheet was edited outside the app. Reloading layout.")
+            self.reload()
+            return
+
+        for offset in range(len(self.values) - (first - 1)):
+            value = ""
+            if offset < len(marks) and marks[offset]:
+                value = marks[offset][0]
+            self.set_cell(first + offset, col_idx, value)
+
+
 class AttendanceManager:
-    def __init__(self, cooldown_seconds=60):
+    def __init__(self, cooldown_seconds=60, client=None, flush_interval=2.0,
+                 max_backoff=64.0, journal=None, batch_limit=500):
         """
         cooldown_seconds: prevent duplicate attendance within this time
+        client: authorized gspread client (defaults to the service account,
+                authorized lazily)
+        flush_interval: seconds between background syncs of journaled marks
+        max_backoff: upper bound in seconds when retrying after API errors
+        journal: AttendanceJournal every mark is written to first
+        batch_limit: max journal entries read per sync round
         """
         self.cooldown = cooldown_seconds
         self.last_marked = {}  # {student_id: timestamp}
 
+        # Authorized on first use (normally the first start_session), so
+        # OAuth never holds up startup
+        self._client = client
+        self._client_lock = threading.Lock()
+        self._spreadsheets = {}  # {period_name: Spreadsheet}
+        self._prefetcher = None
+        self._prefetch_stop = threading.Event()
+
+        # Initialize with None, wait for start_session
+        self.period = None
+        self.sheet = None
+        self.layout = None
+        self.today_str = None
+        self._layouts = {}  # {(period_name, sheet_name): SheetLayout}
+
+        # Write-behind: marks are journaled locally, then synced in the background
+        self.journal = journal if journal is not None else AttendanceJournal()
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.batch_limit = batch_limit
+        self._flush_lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._flusher = None
+
+        # Metrics
+        self.last_flush_latency = 0.0
+        self.flush_count = 0
+        self.flush_failures = 0
+
+        registry.set_gauge("pending_writes", self.pending_count)
+
+        # Replay anything left unsynced by a previous run
+        unsynced = self.journal.unsynced_count()
+        unreconciled = len(self.journal.unreconciled_sessions())
+        if unsynced or unreconciled:
+            logging.info(
+                f"Replaying journal: {unsynced} unsynced marks, "
+                f"{unreconciled} sessions awaiting absences"
+            )
+            self._ensure_flusher()
+
+    @property
+    def client(self):
+        with self._client_lock:
+            if self._client is None:
+                self._client = self._authorize()
+            return self._client
+
+    def _authorize(self):
+        from google.oauth2.service_account import Credentials
+
+        start = time.perf_counter()
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         creds_path = os.path.join(base_dir, "credentials", "service_account.json")
 
@@ -34,37 +266,161 @@ class AttendanceManager:
         creds = Credentials.from_service_account_file(
             creds_path, scopes=scopes
         )
-        self.client = gspread.authorize(creds)
+        client = gspread.Client(auth=creds, session=self._http_session(creds))
+        logging.info(f"Authorized Google Sheets in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return client
 
-        # Initialize with None, wait for start_session
-        self.sheet = None
-        self.today_str = None
+    def _http_session(self, creds):
+        """
+        One keep-alive session shared by the flusher, the prefetcher and
+        start_session, with room for every period's requests at once.
+        """
+        from google.auth.transport.requests import AuthorizedSession
+        from requests.adapters import HTTPAdapter
+
+        session = AuthorizedSession(creds)
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=len(PERIOD_SHEETS) + 2)
+        session.mount("https://", adapter)
+        return session
+
+    def _spreadsheet(self, period_name):
+        # open_by_key costs a metadata request; the handle stays valid
+        spreadsheet = self._spreadsheets.get(period_name)
+        if spreadsheet is None:
+            spreadsheet = self.client.open_by_key(PERIOD_SHEETS[period_name])
+            self._spreadsheets[period_name] = spreadsheet
+        return spreadsheet
+
+    def _layout_for(self, period_name, date_str, refresh=False):
+        """
+        Snapshot of the worksheet holding date_str in a period's spreadsheet
+        (e.g. 'February-First'), read over the network only when not cached.
+        """
+        key = (period_name, _half_month_sheet(date_str))
+
+        layout = self._layouts.get(key)
+        if layout is None or refresh:
+            layout = SheetLayout(self._spreadsheet(period_name).worksheet(key[1]))
+            self._layouts[key] = layout
+        return layout
+
+    def prefetch(self, date_str=None):
+        """
+        Resolve every period's spreadsheet and the worksheet holding
+        date_str (default today) concurrently, so start_session finds them
+        cached. Layouts that are already cached are kept.
+        Returns: periods that could not be loaded
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        date_str = date_str or datetime.now().strftime("%d-%m-%Y")
+        sheet_name = _half_month_sheet(date_str)
+        start = time.perf_counter()
+
+        def load(period_name):
+            key = (period_name, sheet_name)
+            if key in self._layouts:
+                return None
+            try:
+                layout = SheetLayout(self._spreadsheet(period_name).worksheet(sheet_name))
+            except Exception as e:
+                logging.warning(f"Could not prefetch {sheet_name} of {period_name}: {e}")
+                return period_name
+            self._layouts.setdefault(key, layout)
+            return None
+
+        with ThreadPoolExecutor(max_workers=len(PERIOD_SHEETS), thread_name_prefix="prefetch") as pool:
+            failed = [period for period in pool.map(load, PERIOD_SHEETS) if period]
+
+        elapsed = time.perf_counter() - start
+        registry.observe_stage("sheets_prefetch", elapsed)
+        logging.info(
+            f"Prefetched {len(PERIOD_SHEETS) - len(failed)}/{len(PERIOD_SHEETS)} "
+            f"{sheet_name} worksheets in {elapsed * 1000:.0f} ms"
+        )
+        return failed
+
+    def start_prefetch(self, retry_interval=60.0):
+        """
+        Prefetch in the background now and again at every half-month
+        rollover; failed periods are retried every retry_interval seconds.
+        """
+        if self._prefetcher is not None and self._prefetcher.is_alive():
+            return
+        self._prefetch_stop.clear()
+        self._prefetcher = threading.Thread(
+            target=self._prefetch_loop, args=(retry_interval,), name="sheets-prefetch", daemon=True
+        )
+        self._prefetcher.start()
+
+    def _prefetch_loop(self, retry_interval):
+        while not self._prefetch_stop.is_set():
+            failed = self.prefetch()
+            now = datetime.now()
+            # A few seconds past midnight so the new date is the next half's
+            delay = (_next_rollover(now) - now).total_seconds() + 5
+            if failed:
+                delay = min(delay, retry_interval)
+            self._prefetch_stop.wait(delay)
+
+    def _revalidate_async(self, layout, date_str):
+        """
+        Check a prefetched snapshot against the sheet off the caller's thread.
+        """
+        def revalidate():
+            with self._flush_lock:
+                try:
+                    layout.revalidate(date_str)
+                except Exception as e:
+                    logging.warning(f"Could not refresh {layout.sheet.title}: {e}")
+                    layout.stale = True
+
+        threading.Thread(target=revalidate, daemon=True).start()
 
     def start_session(self, period_name):
         """
         Switch to a specific worksheet based on date (e.g., 'February-First')
         period_name should match keys in PERIOD_SHEETS (e.g., 'Period-1')
+        If Sheets cannot be reached the session runs offline from the journal.
         """
         sheet_id = PERIOD_SHEETS.get(period_name)
         if not sheet_id:
             logging.error(f"Invalid period name: {period_name}")
             return False
 
+        today_str = datetime.now().strftime("%d-%m-%Y")
+        layout = self._layouts.get((period_name, _half_month_sheet(today_str)))
         try:
-            spreadsheet = self.client.open_by_key(sheet_id)
-            
-            now = datetime.now()
-            month_name = now.strftime("%B")  # e.g. "January"
-            suffix = "First" if now.day <= 15 else "Second"
-            sheet_name = f"{month_name}-{suffix}"
-            
-            self.sheet = spreadsheet.worksheet(sheet_name)
-            self.today_str = now.strftime("%d-%m-%Y")
-            logging.info(f"Switched to sheet: {sheet_name} in {period_name}")
-            return True
-        except Exception as e:
+            if layout is None:
+                # Not prefetched (yet): one full read; marks reuse this snapshot
+                layout = self._layout_for(period_name, today_str, refresh=True)
+            else:
+                # Local lookup; edits made since the prefetch are picked up in the background
+                self._revalidate_async(layout, today_str)
+        except (gspread.exceptions.SpreadsheetNotFound,
+                gspread.exceptions.WorksheetNotFound) as e:
             logging.error(f"Error starting session: {e}")
             return False
+        except Exception as e:
+            logging.warning(f"Google Sheets unreachable ({e}). Recording {period_name} offline.")
+            layout = None
+
+        self.period = period_name
+        self.today_str = today_str
+        self.layout = layout
+        self.sheet = layout.sheet if layout is not None else None
+        if layout is not None:
+            logging.info(f"Switched to sheet: {layout.sheet.title} in {period_name}")
+        return True
+
+    def roster(self):
+        """
+        Students listed on the current session's worksheet, or None when
+        there is no session or the sheet is not loaded (offline).
+        """
+        if self.layout is None:
+            return None
+        return list(self.layout.rows)
 
     def can_mark(self, student_name):
         """
@@ -76,192 +432,361 @@ class AttendanceManager:
 
     def mark_attendance(self, student_name):
         """
-        Write attendance to Google Sheet using update_cell.
-        If the student is enrolled but not in the sheet, add them at the bottom.
+        Journal a "P" mark locally and return immediately.
+        The background flusher syncs it to Google Sheets, so the camera
+        thread never waits on the network.
         """
-        if self.sheet is None or not self.today_str:
+        if self.period is None or not self.today_str:
             logging.warning("No session started! Cannot mark attendance.")
             return False
 
         if not self.can_mark(student_name):
             return False
 
-        try:
-            all_values = self.sheet.get_all_values()
-            
-            # Find today's column (Row 2, index 1)
-            if len(all_values) < 2:
-                logging.warning("Sheet does not have complete headers (Row 2 missing).")
-                return False
-                
-            headers = all_values[1]
-            if self.today_str not in headers:
-                logging.warning(f"Today's date ({self.today_str}) not found in headers.")
-                return False
-                
-            col_idx = headers.index(self.today_str) + 1  # 1-based index for gspread
-            
-            # Find student row (Row 3 onwards)
-            student_row_idx = None
-            for row_num, row_data in enumerate(all_values[2:], start=3):  # 1-based start at row 3
-                if len(row_data) >= 2 and row_data[1].strip() == student_name.strip():
-                    student_row_idx = row_num
+        self.last_marked[student_name] = time.time()
+        with registry.timer("attendance_mark"):
+            recorded = self.journal.record(self.period, self.today_str, student_name, "P")
+        if not recorded:
+            # Already marked for this period today
+            return False
+
+        self._ensure_flusher()
+        logging.info(f"Attendance recorded for {student_name}")
+        return True
+
+    def pending_count(self):
+        return self.journal.unsynced_count()
+
+    def metrics(self):
+        return {
+            "pending": self.pending_count(),
+            "last_flush_latency": self.last_flush_latency,
+            "flushes": self.flush_count,
+            "flush_failures": self.flush_failures,
+        }
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        self._stop_event.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        delay = self.flush_interval
+        while not self._stop_event.wait(delay):
+            if self.flush():
+                delay = self.flush_interval
+            else:
+                # Back off (e.g. 429 quota errors or offline) before trying again
+                delay = min(delay * 2, self.max_backoff)
+                logging.warning(f"Attendance sync failed, retrying in {delay:.0f}s")
+
+    def close(self):
+        """
+        Stop the background flusher and try a final sync. Anything that
+        cannot be written stays in the journal for the next startup.
+        """
+        self._stop_event.set()
+        self._prefetch_stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        return self.flush()
+
+    def flush(self):
+        """
+        Sync unsynced journal entries in batches, one batch_update per
+        worksheet, then write absences for sessions that have ended.
+        Entries are only marked synced once Sheets has accepted them.
+        A worksheet that fails (unreachable, or no column for the date)
+        is skipped for the rest of this flush without holding up the
+        others; its entries and session are retried on the next one.
+        Returns: True if nothing failed
+        """
+        with self._flush_lock:
+            start = time.perf_counter()
+            failed = set()  # {(period, date)} that could not be written
+            synced = 0
+            after_id = 0
+
+            while True:
+                entries = self.journal.unsynced(self.batch_limit, after_id)
+                if not entries:
                     break
-                    
-            if student_row_idx is None:
+                after_id = entries[-1][0]
+
+                # Group by worksheet, date and status, dropping duplicate names
+                batches = {}
+                for entry_id, period_name, date_str, student_name, status in entries:
+                    if (period_name, date_str) in failed:
+                        continue
+                    ids, names = batches.setdefault((period_name, date_str, status), ([], []))
+                    ids.append(entry_id)
+                    if student_name not in names:
+                        names.append(student_name)
+
+                for (period_name, date_str, status), (ids, names) in batches.items():
+                    if (period_name, date_str) in failed:
+                        continue
+                    layout = None
+                    try:
+                        layout = self._layout_for(period_name, date_str)
+                        if not self._write_marks(layout, date_str, names, status):
+                            # Kept unsynced until the sheet has the date column
+                            failed.add((period_name, date_str))
+                            continue
+                        self.journal.mark_synced(ids)
+                        synced += len(ids)
+                    except Exception as e:
+                        logging.error(f"Error marking attendance: {e}")
+                        failed.add((period_name, date_str))
+                        # The write may have partly landed; re-read before retrying
+                        if layout is not None:
+                            layout.stale = True
+
+            ok = self._reconcile_sessions(failed) and not failed
+
+            if synced or not ok:
+                self.last_flush_latency = time.perf_counter() - start
+                registry.observe_stage("attendance_flush", self.last_flush_latency)
+                self.flush_count += 1
+                if not ok:
+                    self.flush_failures += 1
+            return ok
+
+    def _reconcile_sessions(self, failed=()):
+        """
+        Mark absences for every ended session that has not been processed
+        and whose own "P" marks have all synced.
+        failed: (period, date) pairs whose marks could not be written
+        """
+        ok = True
+        for period_name, date_str in self.journal.unreconciled_sessions():
+            if (period_name, date_str) in failed or \
+                    self.journal.students(period_name, date_str, unsynced_only=True):
+                # Absences wait until everyone present has been written
+                ok = False
+                continue
+            layout = None
+            try:
+                layout = self._layout_for(period_name, date_str)
+                plan = self._plan_absences(layout, date_str)
+                if plan is None:
+                    # Left unreconciled; retried once the sheet has the date column
+                    ok = False
+                    continue
+                self._apply_plan(layout, plan)
+                self.journal.mark_reconciled(period_name, date_str)
+                logging.info(f"Absent marking complete for {period_name} on {date_str}.")
+            except Exception as e:
+                logging.error(f"Error marking absences: {e}")
+                ok = False
+                if layout is not None:
+                    layout.stale = True
+        return ok
+
+    def _write_marks(self, layout, date_str, names, status="P"):
+        """
+        Write status for every name with one batch_update, using the session
+        snapshot instead of re-reading the sheet.
+        If a student is enrolled but not in the sheet, add them at the bottom.
+        Returns: False if the sheet has no headers or no column for date_str
+        (nothing is written)
+        """
+        if layout.stale or date_str not in layout.date_cols:
+            layout.reload()
+
+        # Find today's column (Row 2)
+        if not layout.headers:
+            logging.warning("Sheet does not have complete headers (Row 2 missing).")
+            return False
+
+        col_idx = layout.date_cols.get(date_str)
+        if col_idx is None:
+            logging.warning(f"Today's date ({date_str}) not found in headers.")
+            return False
+
+        sheet = layout.sheet
+        updates = []
+        marked_rows = []
+        new_rows = []
+        for student_name in names:
+            row_num = layout.rows.get(student_name.strip())
+            if row_num is not None:
+                updates.append({
+                    "range": rowcol_to_a1(row_num, col_idx),
+                    "values": [[status]],
+                })
+                marked_rows.append(row_num)
+            else:
                 # Student not in sheet. Since they were recognized, they are enrolled.
                 logging.info(f"Student {student_name} not found in sheet. Adding them...")
-                # We need to append a new row
-                new_row_idx = len(all_values) + 1
-                
-                # Make a row matching the width of headers
-                new_row = [""] * len(headers)
+                new_row = [""] * layout.width
                 new_row[0] = "=ROW()-2"
                 new_row[1] = student_name
-                new_row[col_idx - 1] = "P"  # col_idx is 1-based, list is 0-based
-                
-                self.sheet.append_row(
-                    new_row, 
-                    table_range=f"A{new_row_idx}",
-                    value_input_option="USER_ENTERED"
-                )
-                student_row_idx = new_row_idx
-                
-                # Copy data validation from row above
-                if new_row_idx > 3:
-                    sheet_id = self.sheet.id
-                    reqs = [{
-                        "copyPaste": {
-                            "source": {
-                                "sheetId": sheet_id,
-                                "startRowIndex": new_row_idx - 2,
-                                "endRowIndex": new_row_idx - 1,
-                                "startColumnIndex": 2,  # Dates start at col index 3 (0-based is 2)
-                                "endColumnIndex": len(headers)
-                            },
-                            "destination": {
-                                "sheetId": sheet_id,
-                                "startRowIndex": new_row_idx - 1,
-                                "endRowIndex": new_row_idx,
-                                "startColumnIndex": 2,
-                                "endColumnIndex": len(headers)
-                            },
-                            "pasteType": "PASTE_DATA_VALIDATION"
-                        }
-                    }]
-                    self.sheet.spreadsheet.batch_update({"requests": reqs})
+                new_row[col_idx - 1] = status  # col_idx is 1-based, list is 0-based
+                new_rows.append(new_row)
 
-            else:
-                self.sheet.update_cell(student_row_idx, col_idx, "P")
-            
-            self.last_marked[student_name] = time.time()
-            logging.info(f"Attendance marked for {student_name}")
-            return True
-        except Exception as e:
-            logging.error(f"Error marking attendance: {e}")
-            return False
+        if updates:
+            sheet.batch_update(updates, value_input_option="USER_ENTERED")
+            for row_num in marked_rows:
+                layout.set_cell(row_num, col_idx, status)
+
+        if new_rows:
+            first_new = layout.next_row
+            sheet.append_rows(
+                new_rows,
+                table_range=f"A{first_new}",
+                value_input_option="USER_ENTERED"
+            )
+            for new_row in new_rows:
+                layout.append_row(new_row)
+
+            # Copy data validation from the row above
+            if first_new > 3:
+                sheet.spreadsheet.batch_update({"requests": [
+                    _validation_copy_request(sheet, first_new, len(new_rows), layout.width)
+                ]})
 
-    def mark_absent_after_session(self):
+        logging.info(f"Attendance marked for {len(names)} student(s)")
+        return True
+
+    def mark_absent_after_session(self, dry_run=False):
         """
         Mark students absent (AB) if enrolled but unmarked,
         or Not Enrolled (NA) if in sheet but not enrolled.
         If a student is enrolled but not in the sheet, they are added and marked AB.
+
+        The end of the session is journaled first, so if Sheets is unreachable
+        the absences are written by the replayer once it comes back.
+        All changes go out as one values_batch_update plus one batch_update.
+        dry_run: compute and return the planned changes without writing;
+                 unsynced "P" marks are counted as present.
+        Returns: True once this session's absences are written, False if
+                 they are left for the flusher; the plan dict (None on
+                 error) when dry_run
         """
-        if self.sheet is None or not self.today_str:
+        if self.period is None or not self.today_str:
             logging.warning("No session started! Cannot process absences.")
+            return None if dry_run else False
+
+        if dry_run:
+            with self._flush_lock:
+                present = set(self.journal.students(self.period, self.today_str, unsynced_only=True))
+                try:
+                    layout = self._layout_for(self.period, self.today_str)
+                    return self._plan_absences(layout, self.today_str, present)
+                except Exception as e:
+                    logging.error(f"Error planning absences: {e}")
+                    return None
+
+        self.journal.close_session(self.period, self.today_str)
+
+        # Journaled "P" marks are synced before anyone is marked absent
+        ok = self.flush()
+        if not ok:
+            # Other worksheets still have pending writes
+            self._ensure_flusher()
+        if (self.period, self.today_str) in self.journal.unreconciled_sessions():
+            logging.warning("Could not write to Google Sheets yet; absences will be written later.")
             return False
-            
-        try:
-            all_values = self.sheet.get_all_values()
-            
-            if len(all_values) < 2:
-                return False
-                
-            headers = all_values[1]
-            if self.today_str not in headers:
-                logging.warning(f"Today's date ({self.today_str}) not found in headers to mark absences.")
-                return False
-                
-            col_idx = headers.index(self.today_str) + 1
-            col_idx_0_based = col_idx - 1 
-            
-            enrolled_students = list(load_embeddings().keys())
-            
-            # Map students in sheet
-            sheet_students = {}  # {student_name: row_num}
-            sl_nos = []
-            
-            for row_num, row_data in enumerate(all_values[2:], start=3):
-                if len(row_data) >= 1 and str(row_data[0]).isdigit():
-                    sl_nos.append(int(row_data[0]))
-                    
-                if len(row_data) >= 2:
-                    student_name = row_data[1].strip()
-                    if student_name:
-                        sheet_students[student_name] = (row_num, row_data)
-            
-            next_sl_no = max(sl_nos) + 1 if sl_nos else 1
-            new_row_idx = len(all_values) + 1
-            
-            # First, check for enrolled students NOT in the sheet
-            for student_name in enrolled_students:
-                if student_name not in sheet_students:
-                    # Add them to the sheet and mark AB
-                    logging.info(f"Adding absent enrolled student {student_name} to sheet.")
-                    new_row = [""] * len(headers)
-                    new_row[0] = "=ROW()-2"
-                    new_row[1] = student_name
-                    new_row[col_idx_0_based] = "AB"
-                    
-                    self.sheet.append_row(
-                        new_row, 
-                        table_range=f"A{new_row_idx}",
-                        value_input_option="USER_ENTERED"
-                    )
-                    
-                    # Copy data validation from row above
-                    if new_row_idx > 3:
-                        sheet_id = self.sheet.id
-                        reqs = [{
-                            "copyPaste": {
-                                "source": {
-                                    "sheetId": sheet_id,
-                                    "startRowIndex": new_row_idx - 2,
-                                    "endRowIndex": new_row_idx - 1,
-                                    "startColumnIndex": 2,
-                                    "endColumnIndex": len(headers)
-                                },
-                                "destination": {
-                                    "sheetId": sheet_id,
-                                    "startRowIndex": new_row_idx - 1,
-                                    "endRowIndex": new_row_idx,
-                                    "startColumnIndex": 2,
-                                    "endColumnIndex": len(headers)
-                                },
-                                "pasteType": "PASTE_DATA_VALIDATION"
-                            }
-                        }]
-                        self.sheet.spreadsheet.batch_update({"requests": reqs})
-                    
-                    # Update local trackers so we don't process them again
-                    sheet_students[student_name] = (new_row_idx, new_row)
-                    new_row_idx += 1
-            
-            # Now, process everyone in the sheet
-            for student_name, (row_num, row_data) in sheet_students.items():
-                cell_value = ""
-                if len(row_data) > col_idx_0_based:
-                    cell_value = row_data[col_idx_0_based].strip()
-                    
-                if cell_value in ("P", "AB", "NA"):
-                    continue
-                    
-                if not cell_value:
-                    if student_name in enrolled_students:
-                        self.sheet.update_cell(row_num, col_idx, "AB")
-                        
-            logging.info("Absent marking complete.")
-            return True
-        except Exception as e:
-            logging.error(f"Error marking absences: {e}")
-            return False
+        return True
+
+    def _plan_absences(self, layout, date_str, present=()):
+        """
+        Work out the end-of-session changes against the session snapshot.
+        present: names to treat as already marked "P"
+        Returns: plan dict, or None if the sheet is not usable
+        """
+        # Pick up manual edits made during the period with one small read
+        layout.revalidate(date_str)
+
+        if not layout.headers:
+            logging.warning("Sheet does not have complete headers (Row 2 missing) to mark absences.")
+            return None
+
+        col_idx = layout.date_cols.get(date_str)
+        if col_idx is None:
+            logging.warning(f"Today's date ({date_str}) not found in headers to mark absences.")
+            return None
+
+        sheet = layout.sheet
+        enrolled_students = enrolled_names()
+        enrolled_set = set(enrolled_students)
+
+        # Enrolled students NOT in the sheet are added and marked AB
+        new_rows = []
+        first_new = layout.next_row
+        for student_name in enrolled_students:
+            if student_name not in layout.rows:
+                new_row = [""] * layout.width
+                new_row[0] = "=ROW()-2"
+                new_row[1] = student_name
+                new_row[col_idx - 1] = "P" if student_name in present else "AB"
+                new_rows.append(new_row)
+
+        # Enrolled students in the sheet with an empty cell are marked AB
+        absent = []
+        for student_name, row_num in layout.rows.items():
+            if student_name not in enrolled_set or student_name in present:
+                continue
+            if not layout.cell(row_num, col_idx).strip():
+                absent.append((student_name, row_num))
+
+        data = []
+        if new_rows:
+            last_col = rowcol_to_a1(1, layout.width)[:-1]
+            data.append({
+                "range": _sheet_range(sheet, f"A{first_new}:{last_col}{first_new + len(new_rows) - 1}"),
+                "values": new_rows,
+            })
+        for student_name, row_num in absent:
+            data.append({
+                "range": _sheet_range(sheet, rowcol_to_a1(row_num, col_idx)),
+                "values": [["AB"]],
+            })
+
+        requests = []
+        if new_rows:
+            # Grow the grid if the new rows don't fit
+            missing = first_new + len(new_rows) - 1 - layout.row_count
+            if missing > 0:
+                requests.append({"appendDimension": {
+                    "sheetId": sheet.id,
+                    "dimension": "ROWS",
+                    "length": missing,
+                }})
+            # Copy data validation from the row above
+            if first_new > 3:
+                requests.append(_validation_copy_request(sheet, first_new, len(new_rows), layout.width))
+
+        return {
+            "date": date_str,
+            "column": col_idx,
+            "new_rows": new_rows,
+            "absent": absent,
+            "values": data,
+            "requests": requests,
+        }
+
+    def _apply_plan(self, layout, plan):
+        """
+        Write a plan from _plan_absences: structural changes first so
+        the new rows exist, then every value in one call.
+        """
+        spreadsheet = layout.sheet.spreadsheet
+
+        if plan["requests"]:
+            spreadsheet.batch_update({"requests": plan["requests"]})
+        if plan["values"]:
+            spreadsheet.values_batch_update({
+                "valueInputOption": "USER_ENTERED",
+                "data": plan["values"],
+            })
+
+        for new_row in plan["new_rows"]:
+            logging.info(f"Added absent enrolled student {new_row[1]} to sheet.")
+            layout.append_row(new_row)
+        for student_name, row_num in plan["absent"]:
+            layout.set_cell(row_num, plan["column"], "AB")
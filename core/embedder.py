@@ -1,35 +1,320 @@
+import cv2
 import numpy as np
 import onnxruntime as ort
 import os
 import sys
 import logging
+from utils.metrics import registry
+from utils.paths import DATA_DIR
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+# Model file per precision; the INT8 one is produced by core.quantize
+MODEL_FILES = {
+    "fp32": "facenet.onnx",
+    "int8": "facenet.int8.onnx",
+}
+
+
+def model_path(precision="fp32"):
+    """
+    Bundled model file for a precision.
+    Works in both normal Python and PyInstaller frozen EXE.
+    """
+    # Detect if running inside PyInstaller
+    if getattr(sys, 'frozen', False):
+        base_dir = sys._MEIPASS
+    else:
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    return os.path.join(base_dir, "models", MODEL_FILES[precision])
+
+
+class FacePreprocessor:
+    """
+    Crops, resizes and normalizes faces into caller-owned float32 buffers.
+    The uint8 staging buffer is kept between calls, so steady-state
+    preprocessing allocates nothing per face.
+    """
+
+    def __init__(self, size=160, capacity=32, swap_rb=False):
+        """
+        size: side of the square embedder input
+        capacity: initial number of faces the staging buffer holds
+        swap_rb: feed RGB instead of the camera's BGR order; the stored
+                 gallery was enrolled from BGR crops, so only enable this
+                 together with re-enrollment
+        """
+        self.size = size
+        self.swap_rb = swap_rb
+        self._pixels = np.empty((capacity, size, size, 3), dtype=np.uint8)
+
+    @property
+    def shape(self):
+        return (self.size, self.size, 3)
+
+    def _staging(self, n):
+        if len(self._pixels) < n:
+            self._pixels = np.empty((n,) + self.shape, dtype=np.uint8)
+        return self._pixels[:n]
+
+    def resize_into(self, frame, boxes, out):
+        """
+        Resize each box of a BGR frame into out[i] (uint8, (n, size, size, 3)).
+        Boxes must already be clipped to the frame.
+        """
+        size = (self.size, self.size)
+        for i, (x1, y1, x2, y2) in enumerate(boxes):
+            # The crop is a view; resize writes straight into the slot
+            cv2.resize(frame[y1:y2, x1:x2], size, dst=out[i])
+        return out
+
+    def __call__(self, frame, boxes, out):
+        """
+        frame: BGR camera frame
+        boxes: clipped (x1, y1, x2, y2) boxes
+        out: float32 array of at least (len(boxes), size, size, 3), e.g. the
+             embedder's bound input buffer
+        returns: out[:len(boxes)] filled with (x - 127.5) / 128
+        """
+        n = len(boxes)
+        pixels = self.resize_into(frame, boxes, self._staging(n))
+        if self.swap_rb:
+            pixels = pixels[..., ::-1]
+
+        # copyto casts without the scratch buffer a mixed-type ufunc would need
+        target = out[:n]
+        np.copyto(target, pixels, casting="unsafe")
+        target -= 127.5
+        target *= 1.0 / 128.0
+        return target
+
+
+def build_model_cache(precision="fp32"):
+    """
+    Optimize the model once, e.g. in the parent before spawning worker
+    processes that each load a FaceEmbedder, so they all find the cache.
+    """
+    FaceEmbedder(precision=precision)
 
 
 class FaceEmbedder:
-    def __init__(self):
+    def __init__(self, max_batch_size=32, session=None, intra_op_threads=None,
+                 inter_op_threads=None, execution_mode="sequential",
+                 graph_optimization="all", cache_optimized_model=True,
+                 use_io_binding=True, precision="fp32"):
         """
         Loads FaceNet ONNX model.
         Works in both normal Python and PyInstaller frozen EXE.
+
+        max_batch_size: largest number of faces sent to a single inference call
+        session: ready-made inference session to use instead of the model
+                 file (e.g. a stub for benchmarks)
+        intra_op_threads, inter_op_threads: ONNX Runtime thread pools
+                 (None = runtime default); keep intra low when OpenCV's DNN
+                 detector runs at the same time
+        execution_mode: "sequential" or "parallel"
+        graph_optimization: "disable", "basic", "extended" or "all"
+        cache_optimized_model: save the optimized graph and load it on
+                 later starts instead of optimizing again
+        use_io_binding: run through preallocated input/output buffers
+        precision: "fp32", or "int8" for the quantized model
+                   (create it with `python -m core.quantize`)
         """
+        if precision not in MODEL_FILES:
+            raise ValueError(f"Unknown precision: {precision}")
+        self.precision = precision
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.execution_mode = execution_mode
+        self.graph_optimization = graph_optimization
+        self.cache_optimized_model = cache_optimized_model
 
-        # Detect if running inside PyInstaller
-        if getattr(sys, 'frozen', False):
-            base_dir = sys._MEIPASS
-        else:
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        if session is None:
+            session = self._load_session()
+        self.session = session
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_name = self.session.get_outputs()[0].name if hasattr(self.session, "get_outputs") else None
+
+        # Models exported with a fixed batch dimension cannot take stacked faces
+        batch_dim = self.session.get_inputs()[0].shape[0]
+        if isinstance(batch_dim, int) and batch_dim > 0:
+            logging.info(f"ONNX model has a fixed batch size of {batch_dim}")
+            max_batch_size = min(max_batch_size, batch_dim)
+        self.max_batch_size = max(1, max_batch_size)
+
+        self.use_io_binding = use_io_binding and hasattr(self.session, "io_binding")
+        # One IOBinding over max-size input/output buffers; slices are rebound
+        # when the batch size changes instead of keeping a buffer per size
+        self._binding_buffers = None  # (IOBinding, input buffer, output buffer or None)
+        self._bound_size = None
+
+        self.preprocessor = FacePreprocessor(capacity=self.max_batch_size)
+        self._inputs = None  # input buffer for runs without IO binding
+
+    def _model_path(self):
+        return model_path(self.precision)
 
-        model_path = os.path.join(base_dir, "models", "facenet.onnx")
+    def _optimized_model_path(self):
+        # Versioned so an ONNX Runtime upgrade or level change re-optimizes
+        stem = os.path.splitext(MODEL_FILES[self.precision])[0]
+        return os.path.join(
+            DATA_DIR, "models",
+            f"{stem}.ort-{ort.__version__}.{self.graph_optimization}.onnx",
+        )
+
+    def _session_options(self):
+        options = ort.SessionOptions()
+        if self.intra_op_threads is not None:
+            options.intra_op_num_threads = self.intra_op_threads
+        if self.inter_op_threads is not None:
+            options.inter_op_num_threads = self.inter_op_threads
+        options.execution_mode = EXECUTION_MODES[self.execution_mode]
+        options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[self.graph_optimization]
+        return options
+
+    def _load_session(self):
+        model_path = self._model_path()
 
         if not os.path.exists(model_path):
+            hint = " (run `python -m core.quantize` first)" if self.precision != "fp32" else ""
             raise FileNotFoundError(
-                f"ONNX model NOT found at: {model_path}"
+                f"ONNX model NOT found at: {model_path}{hint}"
             )
 
+        options = self._session_options()
+        cached_path = self._optimized_model_path()
+
+        if self.cache_optimized_model and self.graph_optimization != "disable":
+            if (
+                os.path.exists(cached_path)
+                and os.path.getmtime(cached_path) >= os.path.getmtime(model_path)
+            ):
+                # Already optimized on a previous start
+                logging.info(f"Loading optimized ONNX model from: {cached_path}")
+                options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS["disable"]
+                try:
+                    return ort.InferenceSession(cached_path, options)
+                except Exception as e:
+                    logging.warning(f"Cached optimized model unusable ({e}), rebuilding")
+                    options = self._session_options()
+
+            os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+            # Written under a per-process name and moved into place, so
+            # workers starting together never load a half-written file
+            tmp_path = f"{cached_path}.{os.getpid()}.tmp"
+            options.optimized_model_filepath = tmp_path
+
+            logging.info(f"Loading ONNX model from: {model_path}")
+            try:
+                session = ort.InferenceSession(model_path, options)
+                os.replace(tmp_path, cached_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            return session
+
         logging.info(f"Loading ONNX model from: {model_path}")
 
         # Initialize ONNX Runtime session
-        self.session = ort.InferenceSession(model_path)
-        self.input_name = self.session.get_inputs()[0].name
+        return ort.InferenceSession(model_path, options)
+
+    def _normalize(self, faces, out=None):
+        """
+        (x - 127.5) / 128 as float32, written into out when given.
+        """
+        if out is None:
+            out = np.empty(faces.shape, dtype=np.float32)
+        np.subtract(faces, 127.5, out=out, casting="unsafe")
+        out *= 1.0 / 128.0
+        return out
+
+    def _binding(self, n, face_shape):
+        """
+        Returns: (IOBinding, input view, output view or None) bound for n faces
+        """
+        entry = self._binding_buffers
+        if entry is None or len(entry[1]) < n or entry[1].shape[1:] != face_shape:
+            capacity = max(n, self.max_batch_size)
+            dim = self.session.get_outputs()[0].shape[-1]
+            entry = self._binding_buffers = (
+                self.session.io_binding(),
+                np.empty((capacity,) + face_shape, dtype=np.float32),
+                np.empty((capacity, dim), dtype=np.float32) if isinstance(dim, int) else None,
+            )
+            self._bound_size = None
+
+        binding, inputs, outputs = entry
+        # Leading-axis slices stay contiguous, so they can be bound in place
+        inputs = inputs[:n]
+        if outputs is not None:
+            outputs = outputs[:n]
+        if self._bound_size != n:
+            binding.bind_cpu_input(self.input_name, inputs)
+            if outputs is not None:
+                binding.bind_output(
+                    self.output_name, "cpu", 0, np.float32, outputs.shape, outputs.ctypes.data
+                )
+            else:
+                binding.bind_output(self.output_name, "cpu")
+            self._bound_size = n
+        return binding, inputs, outputs
+
+    def _input_buffer(self, n, face_shape):
+        """
+        Float32 buffer for n faces: the bound input when IO binding is on.
+        """
+        if self.use_io_binding:
+            return self._binding(n, face_shape)[1]
+        if self._inputs is None or len(self._inputs) < n or self._inputs.shape[1:] != face_shape:
+            self._inputs = np.empty((max(n, self.max_batch_size),) + face_shape, dtype=np.float32)
+        return self._inputs[:n]
+
+    def _run(self, inputs):
+        """
+        inputs: normalized batch obtained from _input_buffer
+        returns: (n, dim) embeddings owned by the caller
+        """
+        if not self.use_io_binding:
+            return self.session.run(None, {self.input_name: inputs})[0]
+
+        binding, _, outputs = self._binding(len(inputs), inputs.shape[1:])
+        self.session.run_with_iobinding(binding)
+
+        if outputs is None:
+            return binding.copy_outputs_to_cpu()[0]
+        # The buffer is reused by the next call
+        return outputs.copy()
+
+    def _infer(self, faces):
+        """
+        faces: raw (n, 160, 160, 3) pixels
+        returns: (n, dim) embeddings owned by the caller
+        """
+        inputs = self._input_buffer(len(faces), faces.shape[1:])
+        # Normalize straight into the (bound) input buffer
+        self._normalize(faces, out=inputs)
+        return self._run(inputs)
+
+    def warm_up(self):
+        """
+        Run one inference on a blank face so lazy kernel setup (and the IO
+        binding buffers) happen before the first real frame.
+        Not recorded in the stage metrics.
+        """
+        inputs = self._input_buffer(1, self.preprocessor.shape)
+        inputs.fill(0.0)
+        self._run(inputs)
 
     def get_embedding(self, face):
         """
@@ -37,11 +322,65 @@ class FaceEmbedder:
         returns: embedding vector (512,)
         """
 
-        # Normalize input
-        face = face.astype(np.float32)
-        face = (face - 127.5) / 128.0
-
         # Run inference
-        embedding = self.session.run(None, {self.input_name: face})[0][0]
+        with registry.timer("embed"):
+            embedding = self._infer(face)[0]
+
+        return embedding
+
+    def _chunk_size(self, max_batch_size):
+        if max_batch_size is None:
+            return self.max_batch_size
+        return max(1, min(max_batch_size, self.max_batch_size))
+
+    def embed_faces(self, frame, boxes, max_batch_size=None):
+        """
+        Crop, resize and normalize faces straight into the input tensor.
+
+        frame: BGR camera frame
+        boxes: (x1, y1, x2, y2) boxes clipped to the frame (see clip_boxes)
+        max_batch_size: overrides the per-call chunk size (capped by the model)
+        returns: array of embeddings (N, 512), one row per box
+        """
+        if len(boxes) == 0:
+            return np.empty((0, 0), dtype=np.float32)
+
+        chunk = self._chunk_size(max_batch_size)
+        shape = self.preprocessor.shape
+
+        outputs = []
+        with registry.timer("embed"):
+            for start in range(0, len(boxes), chunk):
+                part = boxes[start:start + chunk]
+                inputs = self.preprocessor(frame, part, self._input_buffer(len(part), shape))
+                outputs.append(self._run(inputs))
+
+        if len(outputs) == 1:
+            return outputs[0]
+        return np.concatenate(outputs, axis=0)
+
+    def get_embeddings_batch(self, faces, max_batch_size=None):
+        """
+        faces: list of (160, 160, 3) crops, or array of shape (N, 160, 160, 3)
+        max_batch_size: overrides the per-call chunk size (capped by the model)
+        returns: array of embeddings (N, 512), one row per input face
+        """
+        if len(faces) == 0:
+            return np.empty((0, 0), dtype=np.float32)
+
+        if isinstance(faces, np.ndarray) and faces.ndim == 4:
+            batch = faces
+        else:
+            batch = np.stack(faces)
+
+        chunk = self._chunk_size(max_batch_size)
+
+        # One inference per chunk instead of one per face
+        outputs = []
+        with registry.timer("embed"):
+            for start in range(0, len(batch), chunk):
+                outputs.append(self._infer(batch[start:start + chunk]))
 
-        return embedding
\ No newline at end of file
+        if len(outputs) == 1:
+            return outputs[0]
+        return np.concatenate(outputs, axis=0)
@@ -1,33 +1,70 @@
 import time
+import threading
 import cv2
 import logging
-from utils.storage import save_embeddings
+import numpy as np
+from utils.storage import append_embeddings, save_enrollment_crops
 
 
 class Enroller:
-    def __init__(self, embeddings_db, max_samples=20, on_update=None):
+    def __init__(self, embeddings_db, max_samples=12, max_templates=8,
+                 sample_interval=0.1, max_similarity=0.95, on_update=None,
+                 keep_crops=True, crop_size=160, timeout=30.0, relax_after=10.0,
+                 relaxed_similarity=0.99, min_samples=3, on_failed=None):
+        """
+        max_samples: diverse candidates to collect before finishing
+        max_templates: templates kept per person (most mutually distant)
+        sample_interval: minimum seconds between accepted candidates
+        max_similarity: candidates closer than this (cosine) to an already
+                        collected sample are skipped as near-duplicates
+        on_update: called with (name, new templates) once they are saved;
+                   self.db already holds the person's full list
+        keep_crops: store the accepted face crops (used to calibrate the
+                    quantized embedder)
+        crop_size: side of the stored crops
+        timeout: seconds before enrollment ends: with at least min_samples
+                 collected it finishes with those, otherwise it fails
+        relax_after: seconds after which near-duplicates are only rejected
+                     above relaxed_similarity (a still face barely changes
+                     between frames)
+        on_failed: called with (name, reason) when enrollment times out or
+                   cannot be saved
+        """
         self.db = embeddings_db
         self.max_samples = max_samples
+        self.max_templates = max_templates
+        self.sample_interval = sample_interval
+        self.max_similarity = max_similarity
         self.on_update = on_update
+        self.keep_crops = keep_crops
+        self.crop_size = crop_size
+        self.timeout = timeout
+        self.relax_after = relax_after
+        self.relaxed_similarity = relaxed_similarity
+        self.min_samples = min_samples
+        self.on_failed = on_failed
 
         self.active = False
         self.name = None
+        self.samples = []
+        self.crops = []
         self.count = 0
+        self.rejected = 0
+        self._last_sample = 0.0
+        self._started = 0.0
 
     def start(self, name):
         self.name = name
-        self.db.setdefault(name, [])
+        self.samples = []
+        self.crops = []
         self.count = 0
+        self.rejected = 0
+        self._last_sample = 0.0
+        self._started = time.monotonic()
         self.active = True
         logging.info(f"Enrolling {name}...")
 
-    def process(self, embedding, frame):
-        if not self.active:
-            return
-
-        self.db[self.name].append(embedding)
-        self.count += 1
-
+    def draw_status(self, frame):
         cv2.putText(
             frame,
             f"Enrolling {self.name}: {self.count}/{self.max_samples}",
@@ -38,13 +75,118 @@ class Enroller:
             2,
         )
 
-        time.sleep(0.15)
+    def _is_duplicate(self, embedding, limit):
+        if not self.samples:
+            return False
+        samples = np.asarray(self.samples, dtype=np.float32)
+        return float(np.max(samples @ embedding)) > limit
+
+    def check_deadline(self, now=None):
+        """
+        End an enrollment that ran past its timeout. Call once per frame,
+        faces or not.
+        """
+        if not self.active:
+            return
+        now = time.monotonic() if now is None else now
+        if now - self._started < self.timeout:
+            return
+
+        if self.count >= self.min_samples:
+            logging.info(f"Enrollment timeout for {self.name}; finishing with {self.count} samples")
+            self._finish()
+            return
+
+        self.active = False
+        reason = (
+            f"only {self.count} distinct samples in {self.timeout:.0f} s "
+            f"({self.rejected} near-duplicates skipped); keep the face in view and move slightly"
+        )
+        logging.warning(f"Enrollment failed for {self.name}: {reason}")
+        if self.on_failed:
+            self.on_failed(self.name, reason)
+
+    def _select_templates(self):
+        """
+        Greedy farthest-point selection: start from the sample closest to the
+        mean, then repeatedly add the one least similar to those chosen.
+        """
+        samples = np.asarray(self.samples, dtype=np.float32)
+        if len(samples) <= self.max_templates:
+            return samples
+
+        chosen = [int(np.argmax(samples @ samples.mean(axis=0)))]
+        closest = samples @ samples[chosen[0]]
+        while len(chosen) < self.max_templates:
+            nxt = int(np.argmin(closest))
+            chosen.append(nxt)
+            closest = np.maximum(closest, samples @ samples[nxt])
+        return samples[chosen]
+
+    def process(self, embedding, frame=None, face=None):
+        """
+        Offer one embedding; never blocks the caller.
+        face: BGR crop the embedding came from, kept if the sample is accepted
+        """
+        if not self.active:
+            return
+
+        now = time.monotonic()
+        self.check_deadline(now)
+        if not self.active or now - self._last_sample < self.sample_interval:
+            return
+
+        limit = self.max_similarity
+        if now - self._started >= self.relax_after:
+            limit = max(limit, self.relaxed_similarity)
+
+        embedding = np.asarray(embedding, dtype=np.float32)
+        embedding = embedding / (np.linalg.norm(embedding) + 1e-10)
+        if self._is_duplicate(embedding, limit):
+            self.rejected += 1
+            return
+
+        self.samples.append(embedding)
+        if self.keep_crops and face is not None and face.size > 0:
+            self.crops.append(cv2.resize(face, (self.crop_size, self.crop_size)))
+        self.count += 1
+        self._last_sample = now
+
+        if frame is not None:
+            self.draw_status(frame)
 
         if self.count >= self.max_samples:
-            save_embeddings(self.db)
-            self.active = False
-            logging.info(f"Enrollment complete for {self.name}")
+            self._finish()
+
+    def _finish(self):
+        self.active = False
+        templates = self._select_templates()
+        logging.info(
+            f"Enrollment complete for {self.name}: kept {len(templates)} of "
+            f"{self.count} samples ({self.rejected} near-duplicates skipped)"
+        )
+
+        # Disk and gallery updates happen off the camera thread
+        threading.Thread(
+            target=self._save, args=(self.name, templates, self.crops), daemon=True
+        ).start()
+
+    def _save(self, name, templates, crops):
+        try:
+            # Only this person's new rows are written to the store
+            self.db[name] = append_embeddings(name, templates)
+        except Exception as e:
+            logging.error(f"Error saving enrollment for {name}: {e}")
+            if self.on_failed:
+                self.on_failed(name, f"could not save: {e}")
+            return
+
+        if crops:
+            try:
+                save_enrollment_crops(name, crops)
+            except Exception as e:
+                logging.warning(f"Could not store enrollment crops for {name}: {e}")
 
-            # THIS IS THE KEY LINE
-            if self.on_update:
-                self.on_update(self.db)
+        # THIS IS THE KEY LINE
+        if self.on_update:
+            self.on_update(name, templates)
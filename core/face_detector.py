@@ -1,16 +1,44 @@
+import time
 import cv2
 import numpy as np
 from utils.paths import PROTOTXT, MODEL
+from utils.metrics import registry
+
+
+def clip_boxes(boxes, width, height):
+    """
+    Clamp (x1, y1, x2, y2) boxes to the frame and drop the ones left empty.
+    """
+    clipped = []
+    for x1, y1, x2, y2 in boxes:
+        x1, x2 = max(0, int(x1)), min(width, int(x2))
+        y1, y2 = max(0, int(y1)), min(height, int(y2))
+        if x2 > x1 and y2 > y1:
+            clipped.append((x1, y1, x2, y2))
+    return clipped
+
 
 class FaceDetector:
     def __init__(self):
         self.net = cv2.dnn.readNetFromCaffe(PROTOTXT, MODEL)
 
     def detect(self, frame, conf_threshold=0.5):
+        with registry.timer("detect"):
+            return self._detect(frame, conf_threshold)
+
+    def warm_up(self, size=(480, 640)):
+        """
+        Run one forward pass on a blank frame so the first real frame is not slow.
+        Not recorded in the stage metrics.
+        """
+        self._detect(np.zeros(size + (3,), dtype=np.uint8), 0.5)
+
+    def _detect(self, frame, conf_threshold):
         h, w = frame.shape[:2]
 
+        # blobFromImage resizes to 300x300 itself; no separate resized copy
         blob = cv2.dnn.blobFromImage(
-            cv2.resize(frame, (300, 300)),
+            frame,
             1.0,
             (300, 300),
             (104.0, 177.0, 123.0),
@@ -27,4 +55,103 @@ class FaceDetector:
                 box = detections[0, 0, i, 3:7] * [w, h, w, h]
                 boxes.append(box.astype(int))
 
-        return boxes
+        # The SSD can place boxes partly outside the frame
+        return clip_boxes(boxes, w, h)
+
+
+class AdaptiveDetector:
+    """
+    Wraps FaceDetector and only runs the SSD every `interval` frames, or
+    sooner when a cheap frame-difference score says the scene changed.
+    In between, the last boxes are carried forward. The interval grows
+    when detection eats more than target_load of the frame budget.
+    """
+
+    def __init__(self, detector, min_interval=1, max_interval=15,
+                 motion_threshold=6.0, target_load=0.5, motion_size=(64, 48)):
+        """
+        detector: FaceDetector to run
+        min_interval, max_interval: bounds for frames between detections
+        motion_threshold: mean absolute grey-level difference (0-255) against
+                          the last detected frame that forces a new detection
+        target_load: fraction of the frame period detection may use
+        motion_size: resolution of the motion check thumbnail
+        """
+        self.detector = detector
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.motion_threshold = motion_threshold
+        self.target_load = target_load
+        self.motion_size = motion_size
+
+        self.interval = min_interval
+        self.detections_run = 0
+        self.detections_skipped = 0
+        self.last_motion = 0.0
+
+        self._boxes = None
+        self._reference = None
+        self._frames_since = 0
+        self._detect_time = None
+        self._frame_period = None
+        self._last_call = None
+
+    def _thumbnail(self, frame):
+        small = cv2.resize(frame, self.motion_size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def _update_interval(self, detect_time):
+        # Exponential moving averages keep the interval from oscillating
+        if self._detect_time is None:
+            self._detect_time = detect_time
+        else:
+            self._detect_time = 0.8 * self._detect_time + 0.2 * detect_time
+
+        if self._frame_period:
+            needed = self._detect_time / (self.target_load * self._frame_period)
+            self.interval = int(min(self.max_interval, max(self.min_interval, np.ceil(needed))))
+
+    def detect(self, frame, conf_threshold=0.5):
+        now = time.perf_counter()
+        if self._last_call is not None:
+            period = now - self._last_call
+            if self._frame_period is None:
+                self._frame_period = period
+            else:
+                self._frame_period = 0.8 * self._frame_period + 0.2 * period
+        self._last_call = now
+
+        thumb = self._thumbnail(frame)
+        if self._reference is not None:
+            self.last_motion = float(np.mean(cv2.absdiff(thumb, self._reference)))
+
+        self._frames_since += 1
+        if (
+            self._boxes is not None
+            and self._frames_since < self.interval
+            and self.last_motion < self.motion_threshold
+        ):
+            self.detections_skipped += 1
+            return self._boxes
+
+        start = time.perf_counter()
+        self._boxes = self.detector.detect(frame, conf_threshold)
+        self._update_interval(time.perf_counter() - start)
+
+        self._reference = thumb
+        self._frames_since = 0
+        self.last_motion = 0.0
+        self.detections_run += 1
+        registry.set_gauge("detection_interval_frames", self.interval)
+        return self._boxes
+
+    def reset(self):
+        """
+        Forget carried-forward boxes, e.g. when the camera restarts.
+        """
+        self._boxes = None
+        self._reference = None
+        self._frames_since = 0
+        self._last_call = None
+        self.detections_run = 0
+        self.detections_skipped = 0
@@ -0,0 +1,457 @@
+import os
+import logging
+import threading
+import numpy as np
+
+
+def l2_normalize(v):
+    v = np.asarray(v, dtype=np.float32)
+    return v / (np.linalg.norm(v, axis=-1, keepdims=True) + 1e-10)
+
+
+def _top_k(scores, k):
+    """
+    Indices of the k largest scores per row, best first.
+    scores: (N, M) matrix
+    """
+    k = min(k, scores.shape[1])
+    if k == 1:
+        return np.argmax(scores, axis=1)[:, None]
+    if k < scores.shape[1]:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.tile(np.arange(k), (len(scores), 1))
+    order = np.argsort(-np.take_along_axis(scores, idx, axis=1), axis=1)
+    return np.take_along_axis(idx, order, axis=1)
+
+
+class FlatIndex:
+    """
+    Exact cosine search: every stored vector is scored with one matmul.
+
+    Rows live in an append-only buffer with spare capacity and are never
+    rewritten while visible. Removing a person stamps their rows with the
+    epoch they died in, and each published view only hides rows dead by its
+    own epoch, so a search sees the gallery exactly as it was when it
+    started. Adding or removing a person costs O(their rows); dead rows are
+    compacted away once they outnumber live ones. Searches never take the
+    write lock.
+    """
+    kind = "flat"
+
+    _ALIVE = np.iinfo(np.int64).max
+
+    def __init__(self):
+        self._buffer = np.empty((0, 0), dtype=np.float32)
+        self._labels = np.array([], dtype=object)
+        self._died = np.array([], dtype=np.int64)  # epoch each row was removed in
+        self._size = 0   # rows used, live or dead
+        self._dead = 0
+        self._epoch = 0
+        self._rows = {}  # {name: [row, ...]} of live rows
+        self._write_lock = threading.RLock()
+        self._publish()
+
+    def __len__(self):
+        return self._size - self._dead
+
+    def _publish(self):
+        self._epoch += 1
+        n = self._size
+        self._view = (self._buffer[:n], self._labels[:n], self._died[:n], self._epoch, self._dead > 0)
+
+    def _reserve(self, n, dim):
+        needed = self._size + n
+        if needed <= len(self._buffer) and self._buffer.shape[1] == dim:
+            return
+        # Grow geometrically; searches keep using the old arrays until _publish
+        capacity = max(needed, 2 * len(self._buffer), 64)
+        buffer = np.zeros((capacity, dim), dtype=np.float32)
+        labels = np.full(capacity, None, dtype=object)
+        died = np.full(capacity, self._ALIVE, dtype=np.int64)
+        if self._size:
+            buffer[:self._size] = self._buffer[:self._size]
+            labels[:self._size] = self._labels[:self._size]
+            died[:self._size] = self._died[:self._size]
+        self._buffer, self._labels, self._died = buffer, labels, died
+
+    def _append(self, labels, vectors):
+        # Rows past _size are not in any published view yet
+        start = self._size
+        self._reserve(len(vectors), vectors.shape[1])
+        self._buffer[start:start + len(vectors)] = vectors
+        for offset, label in enumerate(labels):
+            self._labels[start + offset] = label
+            self._rows.setdefault(label, []).append(start + offset)
+        self._size += len(vectors)
+
+    def _kill(self, rows):
+        # Dead from the next published epoch on; older views still see them
+        self._died[rows] = self._epoch + 1
+        self._dead += len(rows)
+
+    def add(self, labels, vectors):
+        """
+        labels: one name per vector
+        vectors: array (M, dim), normalized on insert
+        """
+        if len(vectors) == 0:
+            return
+        vectors = l2_normalize(vectors)
+        with self._write_lock:
+            self._append(labels, vectors)
+            self._publish()
+
+    def replace(self, name, vectors):
+        """
+        Swap all of name's rows for new ones in one published step.
+        """
+        vectors = l2_normalize(vectors)
+        with self._write_lock:
+            self._kill(self._rows.pop(name, []))
+            if len(vectors):
+                self._append([name] * len(vectors), vectors)
+            self._publish()
+            self._maybe_compact()
+
+    def remove(self, name):
+        with self._write_lock:
+            rows = self._rows.pop(name, [])
+            if rows:
+                self._kill(rows)
+                self._publish()
+                self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self._dead > max(len(self), 256):
+            self.compact()
+
+    def compact(self):
+        """
+        Copy the live rows into fresh arrays (O(gallery), amortized over removals).
+        """
+        with self._write_lock:
+            labels, vectors = self.entries()
+            self._buffer = np.empty((0, 0), dtype=np.float32)
+            self._labels = np.array([], dtype=object)
+            self._died = np.array([], dtype=np.int64)
+            self._size = 0
+            self._dead = 0
+            self._rows = {}
+            if len(vectors):
+                self._append(labels, vectors)
+            self._publish()
+
+    def entries(self):
+        """
+        Copies of the live rows.
+        Returns: (labels, vectors)
+        """
+        with self._write_lock:
+            live = self._died[:self._size] == self._ALIVE
+            return self._labels[:self._size][live], self._buffer[:self._size][live]
+
+    def all_labels(self):
+        return self.entries()[0]
+
+    def all_vectors(self):
+        return self.entries()[1]
+
+    def search(self, queries, k=1):
+        """
+        queries: array (N, dim), already L2-normalized
+        Returns: (scores (N, k), labels (N, k)), best first; rows with
+                 fewer than k live candidates are padded with label None
+                 and score -1
+        """
+        vectors, labels, died, epoch, has_dead = self._view
+        if len(labels) == 0:
+            return (np.full((len(queries), 0), -1.0, dtype=np.float32),
+                    np.empty((len(queries), 0), dtype=object))
+        scores = queries @ vectors.T
+        if has_dead:
+            dead = died <= epoch
+            scores[:, dead] = -np.inf
+        idx = _top_k(scores, k)
+        top_scores = np.take_along_axis(scores, idx, axis=1)
+        top_labels = labels[idx]
+        if has_dead:
+            missing = np.isneginf(top_scores)
+            top_scores[missing] = -1.0
+            top_labels[missing] = None
+        return top_scores, top_labels
+
+    def state(self):
+        labels, vectors = self.entries()
+        return {"vectors": vectors, "labels": labels.astype(str)}
+
+    def load_state(self, state):
+        labels = state["labels"].astype(object)
+        vectors = np.asarray(state["vectors"], dtype=np.float32)
+        with self._write_lock:
+            self._buffer = np.empty((0, 0), dtype=np.float32)
+            self._labels = np.array([], dtype=object)
+            self._died = np.array([], dtype=np.int64)
+            self._size = 0
+            self._dead = 0
+            self._rows = {}
+            if len(labels):
+                self._append(labels, vectors)
+            self._publish()
+
+
+class IVFIndex:
+    """
+    Approximate cosine search with an inverted file: vectors are bucketed
+    under k-means centroids and a query only scans its nprobe closest buckets.
+    Until enough vectors exist to train, it behaves like an exact search.
+
+    Writers build new per-list arrays and publish them as one immutable
+    (centroids, list_vectors, list_labels) snapshot, so searches never lock.
+    """
+    kind = "ivf"
+
+    def __init__(self, nlist=None, nprobe=8, min_train_size=1024, kmeans_iters=10):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.kmeans_iters = kmeans_iters
+
+        self.trained_size = 0
+        self._lists_of = {}  # {name: set of list ids holding their vectors}
+        self._write_lock = threading.RLock()
+        self._snapshot = (None, (), ())  # centroids, per-list (n_c, dim) vectors, per-list names
+
+    @property
+    def centroids(self):
+        return self._snapshot[0]
+
+    @property
+    def list_vectors(self):
+        return self._snapshot[1]
+
+    @property
+    def list_labels(self):
+        return self._snapshot[2]
+
+    def __len__(self):
+        return sum(len(labels) for labels in self.list_labels)
+
+    def _publish(self, centroids, list_vectors, list_labels, touched=None):
+        """
+        touched: {list id: names added} when only some lists changed;
+                 None rebuilds the name -> lists map from scratch
+        """
+        self._snapshot = (centroids, tuple(list_vectors), tuple(list_labels))
+        if touched is None:
+            self._lists_of = {}
+            touched = {c: labels for c, labels in enumerate(list_labels)}
+        for c, names in touched.items():
+            for name in set(names):
+                self._lists_of.setdefault(name, set()).add(c)
+
+    def entries(self):
+        """
+        Returns: (labels, vectors) from one consistent snapshot
+        """
+        _, list_vectors, list_labels = self._snapshot
+        if not list_labels:
+            return np.array([], dtype=object), np.empty((0, 0), dtype=np.float32)
+        return np.concatenate(list_labels), np.vstack(list_vectors)
+
+    def _kmeans(self, vectors, nlist):
+        rng = np.random.default_rng(0)
+        sample = vectors
+        if len(sample) > nlist * 256:
+            sample = sample[rng.choice(len(sample), nlist * 256, replace=False)]
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iters):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = l2_normalize(centroids)
+        return centroids
+
+    def train(self):
+        """
+        (Re)build the coarse quantizer from everything currently stored.
+        """
+        with self._write_lock:
+            labels, vectors = self.entries()
+            nlist = self.nlist or max(1, int(4 * np.sqrt(len(vectors))))
+            nlist = min(nlist, len(vectors))
+
+            centroids = self._kmeans(vectors, nlist)
+            assign = np.argmax(vectors @ centroids.T, axis=1)
+            self._publish(
+                centroids,
+                [np.ascontiguousarray(vectors[assign == c]) for c in range(nlist)],
+                [labels[assign == c] for c in range(nlist)],
+            )
+            self.trained_size = len(vectors)
+        logging.info(f"IVF index trained: {len(vectors)} vectors in {nlist} lists")
+
+    def add(self, labels, vectors):
+        if len(vectors) == 0:
+            return
+        vectors = l2_normalize(vectors)
+        labels = np.array(labels, dtype=object)
+
+        with self._write_lock:
+            centroids, list_vectors, list_labels = self._snapshot
+            list_vectors, list_labels = list(list_vectors), list(list_labels)
+
+            if centroids is None:
+                # Single untrained bucket until there is enough data for k-means
+                if not list_labels:
+                    list_vectors, list_labels = [vectors], [labels]
+                else:
+                    list_vectors[0] = np.vstack([list_vectors[0], vectors])
+                    list_labels[0] = np.concatenate([list_labels[0], labels])
+                self._publish(None, list_vectors, list_labels, {0: labels})
+                if len(self) >= self.min_train_size:
+                    self.train()
+                return
+
+            assign = np.argmax(vectors @ centroids.T, axis=1)
+            touched = {}
+            for c in np.unique(assign):
+                mask = assign == c
+                list_vectors[c] = np.vstack([list_vectors[c], vectors[mask]])
+                list_labels[c] = np.concatenate([list_labels[c], labels[mask]])
+                touched[int(c)] = labels[mask]
+            self._publish(centroids, list_vectors, list_labels, touched)
+
+            # Centroids drift once the gallery has grown well past the training set
+            if len(self) > 4 * self.trained_size:
+                self.train()
+
+    def all_labels(self):
+        return self.entries()[0]
+
+    def all_vectors(self):
+        return self.entries()[1]
+
+    def remove(self, name):
+        """
+        Rebuilds only the lists that hold name's vectors.
+        """
+        with self._write_lock:
+            centroids, list_vectors, list_labels = self._snapshot
+            lists = self._lists_of.pop(name, None)
+            if not lists:
+                return
+            list_vectors, list_labels = list(list_vectors), list(list_labels)
+            for c in lists:
+                keep = list_labels[c] != name
+                list_vectors[c] = list_vectors[c][keep]
+                list_labels[c] = list_labels[c][keep]
+            self._publish(centroids, list_vectors, list_labels, {})
+
+    def replace(self, name, vectors):
+        """
+        Swap all of name's vectors for new ones.
+        """
+        with self._write_lock:
+            self.remove(name)
+            self.add([name] * len(vectors), vectors)
+
+    def search(self, queries, k=1):
+        """
+        Same contract as FlatIndex.search; rows with fewer than k
+        candidates are padded with label None and score -1.
+        """
+        centroids, list_vectors, list_labels = self._snapshot
+        n = len(queries)
+        scores_out = np.full((n, k), -1.0, dtype=np.float32)
+        labels_out = np.full((n, k), None, dtype=object)
+
+        if centroids is None:
+            probes = np.zeros((n, 1), dtype=int) if list_labels else np.empty((n, 0), dtype=int)
+        else:
+            probes = _top_k(queries @ centroids.T, self.nprobe)
+
+        for i, (query, lists) in enumerate(zip(queries, probes)):
+            lists = [c for c in lists if len(list_labels[c])]
+            if not lists:
+                continue
+            vectors = np.vstack([list_vectors[c] for c in lists])
+            labels = np.concatenate([list_labels[c] for c in lists])
+
+            scores = vectors @ query
+            idx = _top_k(scores[None, :], k)[0]
+            scores_out[i, :len(idx)] = scores[idx]
+            labels_out[i, :len(idx)] = labels[idx]
+
+        return scores_out, labels_out
+
+    def state(self):
+        centroids, _, list_labels = self._snapshot
+        labels, vectors = self.entries()
+        state = {"vectors": vectors, "labels": labels.astype(str)}
+        if centroids is not None:
+            state["centroids"] = centroids
+            state["list_sizes"] = np.array([len(l) for l in list_labels])
+            state["trained_size"] = np.array(self.trained_size)
+        return state
+
+    def load_state(self, state):
+        vectors = np.asarray(state["vectors"], dtype=np.float32)
+        labels = state["labels"].astype(object)
+        with self._write_lock:
+            if "centroids" not in state:
+                if len(labels):
+                    self._publish(None, [vectors], [labels])
+                else:
+                    self._publish(None, [], [])
+                return
+
+            self.trained_size = int(state["trained_size"])
+            bounds = np.cumsum(np.concatenate([[0], state["list_sizes"]]))
+            self._publish(
+                np.asarray(state["centroids"], dtype=np.float32),
+                [vectors[a:b] for a, b in zip(bounds[:-1], bounds[1:])],
+                [labels[a:b] for a, b in zip(bounds[:-1], bounds[1:])],
+            )
+
+
+INDEX_TYPES = {
+    FlatIndex.kind: FlatIndex,
+    IVFIndex.kind: IVFIndex,
+}
+
+
+def create_index(kind, **kwargs):
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {kind}")
+    return INDEX_TYPES[kind](**kwargs)
+
+
+def save_index(index, path):
+    """
+    Write the index atomically so a crash never leaves a half-written file.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, kind=np.array(index.kind), **index.state())
+    os.replace(tmp_path, path)
+
+
+def load_index(path):
+    """
+    Returns: the stored index, or None if the file is missing or unreadable
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            state = {key: data[key] for key in data.files}
+        index = create_index(str(state.pop("kind")))
+        index.load_state(state)
+        return index
+    except Exception as e:
+        logging.error(f"Error loading index from {path}: {e}")
+        return None
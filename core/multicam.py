@@ -0,0 +1,238 @@
+import os
+import time
+import queue
+import logging
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+
+def _attach(name):
+    """
+    Open an existing shared memory block. Workers are spawned from the owner
+    and share its resource tracker, so only the owner unlinks the block.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track flag
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedGallery:
+    """
+    Owner side: copies the gallery matrix into a shared memory block once so
+    every camera process can match against it without its own copy.
+    """
+
+    def __init__(self, labels, matrix):
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+        np.ndarray(matrix.shape, dtype=np.float32, buffer=self.shm.buf)[:] = matrix
+
+        # Picklable description handed to the workers
+        self.descriptor = {
+            "name": self.shm.name,
+            "shape": matrix.shape,
+            "labels": [str(label) for label in labels],
+        }
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class GalleryView:
+    """
+    Worker side: read-only view of a SharedGallery.
+    """
+
+    def __init__(self, descriptor):
+        self.shm = _attach(descriptor["name"])
+        self.matrix = np.ndarray(descriptor["shape"], dtype=np.float32, buffer=self.shm.buf)
+        self.matrix.flags.writeable = False
+        self.labels = np.array(descriptor["labels"], dtype=object)
+
+    def match(self, embeddings, threshold):
+        """
+        Returns: list of (name, similarity_score), one per embedding
+        """
+        if len(self.labels) == 0:
+            return [("Unknown", -1.0)] * len(embeddings)
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        embeddings = embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-10)
+        scores = embeddings @ self.matrix.T
+        best = np.argmax(scores, axis=1)
+
+        results = []
+        for i, b in enumerate(best):
+            score = float(scores[i, b])
+            results.append((self.labels[b] if score >= threshold else "Unknown", score))
+        return results
+
+    def close(self):
+        del self.matrix
+        self.shm.close()
+
+
+def camera_worker(camera_index, descriptor, results, stop_event, threshold,
+                  precision="fp32", intra_op_threads=1):
+    """
+    Entry point of one camera process: capture, detect, track, embed and
+    match locally; only recognized names and FPS go back to the parent.
+    intra_op_threads: OpenCV and ONNX Runtime threads for this process
+    """
+    import cv2
+    from core.face_detector import FaceDetector, AdaptiveDetector
+    from core.embedder import FaceEmbedder
+    from core.tracker import FaceTracker
+
+    # Cameras share the CPU; keep each process's own thread pools small
+    cv2.setNumThreads(intra_op_threads)
+    detector = AdaptiveDetector(FaceDetector())
+    embedder = FaceEmbedder(precision=precision, intra_op_threads=intra_op_threads)
+    tracker = FaceTracker()
+    gallery = GalleryView(descriptor)
+
+    cap = cv2.VideoCapture(camera_index, cv2.CAP_DSHOW)
+    if not cap.isOpened():
+        results.put(("error", camera_index, "camera not found"))
+        gallery.close()
+        return
+
+    frames = 0
+    window_start = time.perf_counter()
+
+    while not stop_event.is_set():
+        ret, frame = cap.read()
+        if not ret:
+            results.put(("error", camera_index, "camera stopped delivering frames"))
+            break
+
+        tracks = tracker.update(detector.detect(frame))
+        stale = [track for track in tracks if tracker.needs_embedding(track)]
+
+        if stale:
+            embeddings = embedder.embed_faces(frame, [t.box for t in stale])
+            for track, (name, score) in zip(stale, gallery.match(embeddings, threshold)):
+                tracker.assign(track, name, score)
+                if name != "Unknown":
+                    results.put(("mark", camera_index, name, score))
+        for track in tracks:
+            if track not in stale:
+                tracker.reuse(track)
+
+        frames += 1
+        elapsed = time.perf_counter() - window_start
+        if elapsed >= 1.0:
+            results.put(("fps", camera_index, frames / elapsed))
+            frames = 0
+            window_start = time.perf_counter()
+
+    cap.release()
+    gallery.close()
+
+
+class MultiCameraManager:
+    """
+    Runs one detect/embed process per camera, all matching against one
+    shared read-only gallery. Recognized names are funneled back to a
+    single AttendanceManager on this process.
+
+    The gallery is published when the cameras start; enrollment and
+    deletes happen with the cameras stopped, so it does not change
+    while they run.
+    """
+
+    def __init__(self, recognizer, attendance, camera_indices, precision="fp32",
+                 intra_op_threads=None):
+        """
+        intra_op_threads: threads per camera process, default an even share
+                          of the CPUs
+        """
+        self.recognizer = recognizer
+        self.attendance = attendance
+        self.camera_indices = list(camera_indices)
+        self.precision = precision  # embedder model each worker loads
+        if intra_op_threads is None:
+            intra_op_threads = max(1, (os.cpu_count() or 1) // max(1, len(self.camera_indices)))
+        self.intra_op_threads = intra_op_threads
+
+        self.fps = {index: 0.0 for index in self.camera_indices}
+        self.errors = {}
+        self._processes = []
+        self._gallery = None
+        self._collector = None
+        self._collector_stop = threading.Event()
+
+    @property
+    def running(self):
+        return any(p.is_alive() for p in self._processes)
+
+    def start(self):
+        # spawn: a clean interpreter per camera on every platform
+        ctx = mp.get_context("spawn")
+        self._results = ctx.Queue()
+        self._stop_event = ctx.Event()
+        self._gallery = SharedGallery(*self.recognizer.gallery_matrix())
+
+        for index in self.camera_indices:
+            process = ctx.Process(
+                target=camera_worker,
+                args=(index, self._gallery.descriptor, self._results, self._stop_event,
+                      self.recognizer.threshold, self.precision, self.intra_op_threads),
+                name=f"camera-{index}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+        self._collector_stop.clear()
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+        logging.info(f"Started {len(self._processes)} camera processes: {self.camera_indices}")
+
+    def _collect(self):
+        # The only place attendance is written for all cameras
+        while not self._collector_stop.is_set():
+            try:
+                message = self._results.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            self._handle(message)
+
+        # Whatever the workers sent before exiting
+        try:
+            while True:
+                self._handle(self._results.get_nowait())
+        except queue.Empty:
+            pass
+
+    def _handle(self, message):
+        kind, index = message[0], message[1]
+        if kind == "mark":
+            self.attendance.mark_attendance(message[2])
+        elif kind == "fps":
+            self.fps[index] = message[2]
+        elif kind == "error":
+            self.errors[index] = message[2]
+            logging.error(f"Camera {index}: {message[2]}")
+
+    def stop(self):
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+        self._collector_stop.set()
+        if self._collector is not None:
+            self._collector.join()
+
+        if self._gallery is not None:
+            self._gallery.close()
+            self._gallery = None
+        self._processes = []
+        logging.info(f"Camera processes stopped. Last FPS: {self.fps}")
@@ -0,0 +1,140 @@
+import threading
+import time
+import logging
+from collections import deque
+
+
+class PipelineStopped(Exception):
+    """
+    Raised by a stage function to shut the whole pipeline down
+    (e.g. the camera stopped delivering frames).
+    """
+
+
+class LatestQueue:
+    """
+    Bounded hand-off between stages. When full, the oldest item is dropped
+    so a slow consumer always gets the most recent frame instead of a backlog.
+    """
+
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """
+        Returns: the oldest queued item, or None on timeout
+        """
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class Stage(threading.Thread):
+    """
+    Worker thread running fn on every item of its inbox and passing the
+    result to each outbox. A stage without an inbox is a source and calls
+    fn() in a loop. Returning None from fn forwards nothing.
+    """
+
+    def __init__(self, name, fn, stop_event, inbox=None, outboxes=()):
+        super().__init__(name=name, daemon=True)
+        self.fn = fn
+        self.stop_event = stop_event
+        self.inbox = inbox
+        self.outboxes = list(outboxes)
+
+        self.processed = 0
+        self.last_latency = 0.0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if self.inbox is not None:
+                item = self.inbox.get(timeout=0.1)
+                if item is None:
+                    continue
+
+            start = time.perf_counter()
+            try:
+                result = self.fn(item) if self.inbox is not None else self.fn()
+            except PipelineStopped:
+                self.stop_event.set()
+                break
+            except Exception as e:
+                logging.error(f"Error in {self.name} stage: {e}")
+                continue
+            self.last_latency = time.perf_counter() - start
+            self.processed += 1
+
+            if result is not None:
+                for outbox in self.outboxes:
+                    outbox.put(result)
+
+
+class Pipeline:
+    """
+    A set of stages connected by LatestQueues, started and stopped together.
+    """
+
+    def __init__(self):
+        self.stop_event = threading.Event()
+        self.queues = {}
+        self.stages = []
+
+    def queue(self, name, maxsize=1):
+        self.queues[name] = LatestQueue(maxsize)
+        return self.queues[name]
+
+    def add_stage(self, name, fn, inbox=None, outboxes=()):
+        stage = Stage(name, fn, self.stop_event, inbox=inbox, outboxes=outboxes)
+        self.stages.append(stage)
+        return stage
+
+    @property
+    def running(self):
+        return not self.stop_event.is_set()
+
+    def start(self):
+        self.stop_event.clear()
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self):
+        self.stop_event.set()
+        for stage in self.stages:
+            stage.join()
+        for q in self.queues.values():
+            q.clear()
+
+    def depths(self):
+        """
+        Returns: {queue_name: (items waiting, items dropped so far)}
+        """
+        return {name: (len(q), q.dropped) for name, q in self.queues.items()}
+
+    def stats(self):
+        """
+        Returns: {stage_name: (items processed, last latency in seconds)}
+        """
+        return {stage.name: (stage.processed, stage.last_latency) for stage in self.stages}
@@ -0,0 +1,163 @@
+"""
+Builds the INT8 FaceNet model used by FaceEmbedder(precision="int8").
+
+Static quantization calibrates activation ranges on the face crops stored
+during enrollment; dynamic quantization only needs the fp32 model.
+
+Run from the project root:
+    python -m core.quantize --mode static
+"""
+import argparse
+import logging
+import os
+import tempfile
+import numpy as np
+import onnx
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    CalibrationMethod,
+    QuantFormat,
+    QuantType,
+    quantize_dynamic,
+    quantize_static,
+)
+from core.embedder import model_path
+from utils.storage import load_enrollment_crops
+
+CALIBRATION_METHODS = {
+    "minmax": CalibrationMethod.MinMax,
+    "entropy": CalibrationMethod.Entropy,
+    "percentile": CalibrationMethod.Percentile,
+}
+
+
+def normalize_crops(crops):
+    """
+    uint8 (n, 160, 160, 3) BGR crops -> the float32 input FaceEmbedder feeds
+    """
+    return (np.asarray(crops, dtype=np.float32) - 127.5) / 128.0
+
+
+def calibration_crops(max_crops=500, seed=0):
+    """
+    Up to max_crops enrollment crops, sampled at random across people.
+    """
+    per_person = list(load_enrollment_crops().values())
+    if not per_person:
+        return np.empty((0, 160, 160, 3), dtype=np.uint8)
+
+    crops = np.concatenate(per_person)
+    if len(crops) > max_crops:
+        rng = np.random.default_rng(seed)
+        crops = crops[rng.choice(len(crops), max_crops, replace=False)]
+    return crops
+
+
+class CropCalibrationReader(CalibrationDataReader):
+    """
+    Feeds enrollment crops to the calibrator, batch_size faces per run.
+    """
+
+    def __init__(self, input_name, crops, batch_size=1):
+        self.input_name = input_name
+        self.crops = crops
+        self.batch_size = batch_size
+        self._start = 0
+
+    def get_next(self):
+        if self._start >= len(self.crops):
+            return None
+        batch = self.crops[self._start:self._start + self.batch_size]
+        self._start += self.batch_size
+        return {self.input_name: normalize_crops(batch)}
+
+    def rewind(self):
+        self._start = 0
+
+
+def _model_input(path):
+    """
+    Returns: (input name, batch dimension or None when dynamic)
+    """
+    graph_input = onnx.load(path, load_external_data=False).graph.input[0]
+    dim = graph_input.type.tensor_type.shape.dim[0]
+    return graph_input.name, (dim.dim_value or None)
+
+
+def quantize_embedder(mode="static", source=None, output=None, crops=None,
+                      calibrate_method="minmax", per_channel=True):
+    """
+    mode: "static" (calibrated activations) or "dynamic" (weights only)
+    source, output: fp32 and INT8 model paths (default: models/ next to
+                    the fp32 model, where FaceEmbedder looks for them)
+    crops: uint8 calibration faces (default: stored enrollment crops)
+    Returns: the output path
+    """
+    source = source or model_path("fp32")
+    output = output or model_path("int8")
+
+    if mode == "dynamic":
+        quantize_dynamic(source, output, weight_type=QuantType.QInt8, per_channel=per_channel)
+        return output
+
+    if crops is None:
+        crops = calibration_crops()
+    if len(crops) == 0:
+        raise ValueError(
+            "No enrollment crops to calibrate with; enroll students first or use --mode dynamic"
+        )
+
+    input_name, batch_dim = _model_input(source)
+    reader = CropCalibrationReader(input_name, crops, batch_size=batch_dim or 16)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Shape inference and folding make more nodes quantizable
+        prepared = os.path.join(work_dir, "prepared.onnx")
+        try:
+            from onnxruntime.quantization.shape_inference import quant_pre_process
+            quant_pre_process(source, prepared)
+        except Exception as e:
+            logging.warning(f"Quantization pre-processing skipped: {e}")
+            prepared = source
+
+        quantize_static(
+            prepared,
+            output,
+            reader,
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=per_channel,
+            calibrate_method=CALIBRATION_METHODS[calibrate_method],
+        )
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize the FaceNet embedder to INT8")
+    parser.add_argument("--mode", choices=("static", "dynamic"), default="static")
+    parser.add_argument("--source", help="fp32 model (default: models/facenet.onnx)")
+    parser.add_argument("--output", help="INT8 model (default: models/facenet.int8.onnx)")
+    parser.add_argument("--max-crops", type=int, default=500, help="calibration faces to use")
+    parser.add_argument("--calibrate-method", choices=sorted(CALIBRATION_METHODS), default="minmax")
+    parser.add_argument("--per-tensor", action="store_true", help="one weight scale per tensor")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    crops = calibration_crops(args.max_crops) if args.mode == "static" else None
+    if crops is not None:
+        logging.info(f"Calibrating on {len(crops)} enrollment crops")
+
+    output = quantize_embedder(
+        mode=args.mode,
+        source=args.source,
+        output=args.output,
+        crops=crops,
+        calibrate_method=args.calibrate_method,
+        per_channel=not args.per_tensor,
+    )
+    print(f"Wrote {output}; load it with FaceEmbedder(precision=\"int8\") or --precision int8")
+
+
+if __name__ == "__main__":
+    main()
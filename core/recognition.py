@@ -1,61 +1,371 @@
+import logging
+import threading
+import time
 import numpy as np
-from numpy.linalg import norm
+from core.index import FlatIndex, create_index, load_index, save_index, l2_normalize
+from utils.paths import INDEX_PATH
+from utils.metrics import registry
+
+# How many extra templates to fetch per requested identity, so that
+# several templates of the same person don't crowd out the top-k
+TEMPLATE_OVERSAMPLE = 8
 
 
 class FaceRecognizer:
-    def __init__(self, embeddings_db, threshold=0.65):
+    def __init__(self, embeddings_db, threshold=0.65, index_type="mean",
+                 index_path=INDEX_PATH, nprobe=8, roster_fallback=True,
+                 save_delay=2.0):
         """
         embeddings_db: dict {name: [np.ndarray, ...]}
         threshold: cosine similarity threshold
+        index_type: "mean" - one averaged template per person, exact search
+                    "flat" - every enrollment template, exact search
+                    "ivf"  - every enrollment template, approximate search
+        index_path: where template indexes are persisted (not used for "mean")
+        nprobe: number of inverted lists scanned per query by "ivf"
+        roster_fallback: while a roster is set, faces that match nobody on
+                         it are searched against the full gallery, so
+                         enrolled students missing from the sheet are still
+                         marked (and appended to it, as before scoping)
+        save_delay: seconds a gallery change waits before the index file is
+                    rewritten in the background, so a burst of enrollments
+                    or deletes costs one write
         """
         self.db = embeddings_db
         self.threshold = threshold
-        self.mean_db = self._build_mean_embeddings()
+        self.index_type = index_type
+        self.index_path = index_path if index_type != "mean" else None
+        self.nprobe = nprobe
+        self.roster_fallback = roster_fallback
+        self.save_delay = save_delay
+
+        # Period scoping: (roster names, fallback) and (sub-index, fallback), or None for everyone
+        self._roster = None
+        self._scope = None
+
+        # Writers (enrollment, deletes, roster changes) serialize on this;
+        # recognize_batch never takes it, the indexes publish their updates
+        self._write_lock = threading.RLock()
+        self._sums = {}     # "mean": {name: sum of normalized templates}
+        self._dirty = False  # index changed since it was last saved
+        self._save_lock = threading.Lock()  # one index file write at a time
+        self._save_requested = threading.Event()
+        self._saver = None
+
+        self.index, self._counts = self._open_index()
+        self._sync_index()
 
     def update_db(self, embeddings_db):
-        self.db = embeddings_db
-        self.mean_db = self._build_mean_embeddings()
+        """
+        Resync with a whole db; only people whose template count changed
+        are touched. Prefer add_samples / remove_identity when the change
+        is known.
+        """
+        with self._write_lock:
+            self.db = embeddings_db
+            self._sync_index()
+
+    # ---- incremental gallery updates ----
+
+    def add_identity(self, name, embeddings):
+        """
+        Set name's templates, replacing any already indexed.
+        embeddings: array (M, dim)
+        """
+        with self._write_lock:
+            self._add(name, embeddings, replace=True)
+        self._schedule_save()
+
+    def add_samples(self, name, embeddings):
+        """
+        Append new templates to name (enrolling them if unknown). With the
+        "mean" index the running mean is updated from a kept sum, so the
+        cost is O(new samples), not O(everything enrolled).
+        embeddings: array (M, dim)
+        """
+        with self._write_lock:
+            self._add(name, embeddings, replace=False)
+        self._schedule_save()
+
+    def remove_identity(self, name):
+        with self._write_lock:
+            self._remove(name)
+        self._schedule_save()
+
+    def save(self):
+        """
+        Persist the template index now if it changed (no-op for "mean").
+        Gallery changes already save in the background; call this only
+        where blocking on the write is fine, e.g. before exiting.
+        """
+        if not self.index_path:
+            return
+        with self._save_lock:
+            with self._write_lock:
+                if not self._dirty:
+                    return
+                # Changes made during the write mark it dirty again
+                self._dirty = False
+            try:
+                # Snapshots the index, so writers aren't held up by the file write
+                save_index(self.index, self.index_path)
+            except Exception as e:
+                self._dirty = True
+                logging.error(f"Error saving index: {e}")
+
+    def _schedule_save(self):
+        """
+        Ask the saver thread for a write once save_delay has passed.
+        The index file is only a cache of the embeddings db (_sync_index
+        catches up on whatever a lost write missed), so it isn't joined
+        on exit.
+        """
+        if not self.index_path or not self._dirty:
+            return
+        with self._write_lock:
+            if self._saver is None:
+                self._saver = threading.Thread(target=self._save_loop, daemon=True)
+                self._saver.start()
+        self._save_requested.set()
+
+    def _save_loop(self):
+        while True:
+            self._save_requested.wait()
+            # Let a burst of changes settle into one write
+            time.sleep(self.save_delay)
+            self._save_requested.clear()
+            self.save()
+
+    def _add(self, name, embeddings, replace):
+        # The caller owns self.db; only the index and its counts change here
+        embeddings = self._l2_normalize(np.asarray(embeddings, dtype=np.float32))
+        if len(embeddings) == 0:
+            if replace:
+                self._remove(name)
+            return
+
+        if self._roster is not None and name not in self._counts:
+            # Enrolled after the roster was read (not on the sheet yet)
+            self._roster[0].add(name)
+
+        if replace or name not in self._counts:
+            count = len(embeddings)
+        else:
+            count = self._counts[name] + len(embeddings)
+
+        if self.index_type == "mean":
+            total = embeddings.sum(axis=0)
+            if count != len(embeddings):
+                total += self._sums[name]
+            self._sums[name] = total
+            vectors = (total / count)[None, :]
+            self.index.replace(name, vectors)
+            self._update_scope(name, vectors, replace=True)
+        else:
+            if name in self._counts and replace:
+                self.index.replace(name, embeddings)
+            else:
+                self.index.add([name] * len(embeddings), embeddings)
+            self._update_scope(name, embeddings, replace)
+
+        self._counts[name] = count
+        self._dirty = True
+
+    def _remove(self, name):
+        if name not in self._counts:
+            return
+        self.index.remove(name)
+        del self._counts[name]
+        self._sums.pop(name, None)
+        self._dirty = True
+
+        scope = self._scope
+        if scope is not None and name in self._roster[0]:
+            scope[0].remove(name)
+            if len(scope[0]) == 0:
+                self.set_roster(*self._roster)
+
+    def _update_scope(self, name, vectors, replace):
+        """
+        Mirror one person's change into the roster sub-index.
+        """
+        if self._roster is None or name not in self._roster[0]:
+            return
+        scope = self._scope
+        if scope is None:
+            # First roster member to be enrolled: scope from scratch
+            self.set_roster(*self._roster)
+        elif replace:
+            scope[0].replace(name, vectors)
+        else:
+            scope[0].add([name] * len(vectors), vectors)
 
     def _l2_normalize(self, v):
-        return v / (norm(v) + 1e-10)
+        return l2_normalize(v)
+
+    def _new_index(self):
+        if self.index_type == "mean":
+            return FlatIndex()
+        index = create_index(self.index_type)
+        if self.index_type == "ivf":
+            index.nprobe = self.nprobe
+        return index
 
-    def _build_mean_embeddings(self):
+    def _open_index(self):
         """
-        Compute one mean embedding per person
+        Reuse the persisted index when it matches the configured type.
+        Returns: (index, {name: number of templates indexed})
         """
-        mean_db = {}
+        if self.index_path:
+            index = load_index(self.index_path)
+            if index is not None and index.kind == self.index_type:
+                if self.index_type == "ivf":
+                    index.nprobe = self.nprobe
+                names, counts = np.unique(index.entries()[0].astype(str), return_counts=True)
+                logging.info(f"Loaded {self.index_type} index with {len(index)} templates")
+                return index, dict(zip(names.tolist(), counts.tolist()))
+        return self._new_index(), {}
+
+    def _sync_index(self):
+        """
+        Incrementally bring the index in line with self.db: only people
+        whose template count changed are re-indexed.
+        """
+        for name in list(self._counts):
+            if len(self.db.get(name, [])) == 0:
+                self._remove(name)
 
         for name, embeddings in self.db.items():
-            if len(embeddings) == 0:
+            if len(embeddings) == 0 or self._counts.get(name) == len(embeddings):
                 continue
+            self._add(name, embeddings, replace=True)
+
+        self._schedule_save()
+
+    def set_roster(self, names, fallback=None):
+        """
+        Restrict matching to one class, e.g. the students on the selected
+        period's sheet. The class's rows of the gallery are copied into a
+        small exact index once, so every frame searches only those first.
+        Students enrolled while the roster is set join it.
 
-            embeddings = np.array(embeddings)
-            embeddings = np.array([self._l2_normalize(e) for e in embeddings])
+        Absence marking appends every enrolled student missing from a sheet
+        (as AB), so once a period has been closed its sheet lists everyone
+        enrolled at that time: the scope then narrows only to that period's
+        sheet, and the speedup comes from faces matched on it before the
+        full-gallery fallback is needed.
+        names: roster, or None to search everyone again
+        fallback: override roster_fallback for this roster; without it,
+                  enrolled students missing from the sheet are never matched
+        """
+        with self._write_lock:
+            if names is None:
+                self._roster = None
+                self._scope = None
+                return
+
+            if fallback is None:
+                fallback = self.roster_fallback
+            names = set(names)
+            labels, vectors = self.index.entries()
+            keep = np.array([label in names for label in labels], dtype=bool)
 
-            mean_db[name] = np.mean(embeddings, axis=0)
+            self._roster = (names, fallback)
+            if not keep.any():
+                logging.warning("Nobody on the roster is enrolled; matching against everyone")
+                self._scope = None
+                return
 
-        return mean_db
+            scope = FlatIndex()
+            scope.add(list(labels[keep]), vectors[keep])
+            self._scope = (scope, fallback)
+        logging.info(
+            f"Matching against {int(keep.sum())} of {len(labels)} gallery entries "
+            f"({len(set(labels[keep]))} students on the roster)"
+        )
 
-    def _cosine_similarity(self, a, b):
-        return np.dot(a, b) / (norm(a) * norm(b) + 1e-10)
+    def gallery_matrix(self):
+        """
+        Everything the index searches, as plain arrays for exact matching
+        elsewhere (e.g. camera worker processes). With a roster set and no
+        fallback, only the roster's rows.
+        Returns: (labels, normalized (M, dim) float32 matrix)
+        """
+        index = self.index
+        scope = self._scope
+        if scope is not None and not scope[1]:
+            index = scope[0]
+        labels, vectors = index.entries()
+        return labels, np.ascontiguousarray(vectors, dtype=np.float32)
 
     def recognize(self, embedding):
         """
-        Returns: (name, similarity_score)
+        Returns: (name, similarity_score), name "Unknown" below the threshold
         """
-        embedding = self._l2_normalize(embedding)
+        return self.decide(self.recognize_batch(np.asarray(embedding)[None, :])[0])
 
-        best_name = "Unknown"
-        best_score = -1.0
+    def decide(self, candidates):
+        """
+        Top-1 decision for one face of recognize_batch.
+        Returns: (name, similarity_score), name "Unknown" below the threshold
+        """
+        name, score = candidates[0]
+        return (name if score >= self.threshold else "Unknown"), score
 
-        for name, ref_emb in self.mean_db.items():
-            score = self._cosine_similarity(embedding, ref_emb)
+    def recognize_batch(self, embeddings, top_k=1):
+        """
+        Score every face of a frame against the gallery with one search.
+        embeddings: array (N, dim)
+        Returns: list (one per face) of [(name, similarity_score), ...]
+                 best first, at most top_k entries, with the real names
+                 whatever their score; apply the threshold with decide().
+                 [("Unknown", -1.0)] when the gallery is empty.
+        """
+        if len(embeddings) == 0:
+            return []
+        if len(self.index) == 0:
+            return [[("Unknown", -1.0)] for _ in range(len(embeddings))]
+
+        embeddings = self._l2_normalize(np.asarray(embeddings, dtype=np.float32))
+
+        scope = self._scope
+        with registry.timer("recognize"):
+            if scope is None:
+                return self._search(self.index, embeddings, top_k)
 
-            if score > best_score:
-                best_score = score
-                best_name = name
+            index, fallback = scope
+            results = self._search(index, embeddings, top_k)
+            if fallback:
+                # Only faces nobody on the roster matched go to the full gallery
+                misses = [i for i, candidates in enumerate(results) if candidates[0][1] < self.threshold]
+                if misses:
+                    for i, candidates in zip(misses, self._search(self.index, embeddings[misses], top_k)):
+                        if candidates[0][1] >= self.threshold:
+                            results[i] = candidates
+            return results
+
+    def _search(self, index, embeddings, top_k):
+        """
+        embeddings: normalized (N, dim)
+        Returns: one [(name, score), ...] list per face, as recognize_batch
+        """
+        # Template indexes, and roster scopes cut from them, hold several
+        # rows per person
+        k = top_k if self.index_type == "mean" else top_k * TEMPLATE_OVERSAMPLE
+        scores, labels = index.search(embeddings, k)
 
-        if best_score >= self.threshold:
-            return best_name, best_score
+        results = []
+        for row_scores, row_labels in zip(scores, labels):
+            # Keep the best template per person
+            candidates = []
+            seen = set()
+            for name, score in zip(row_labels, row_scores):
+                if name is None or name in seen:
+                    continue
+                seen.add(name)
+                candidates.append((name, float(score)))
+                if len(candidates) == top_k:
+                    break
+            results.append(candidates or [("Unknown", -1.0)])
 
-        return "Unknown", best_score
+        return results
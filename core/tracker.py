@@ -0,0 +1,164 @@
+import numpy as np
+
+
+def box_iou(a, b):
+    """
+    a: (N, 4), b: (M, 4) boxes as (x1, y1, x2, y2)
+    returns: (N, M) intersection-over-union matrix
+    """
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-10)
+
+
+class Track:
+    def __init__(self, track_id, box):
+        self.id = track_id
+        self.box = tuple(box)
+        self.name = None       # identity from the last embedding, None until embedded
+        self.score = -1.0
+        self.embedded_box = None
+        self.frames_since_embed = 0
+        self.missed = 0
+
+
+class FaceTracker:
+    """
+    Associates detections across frames (IoU first, then centroid distance)
+    so an already-recognized face keeps its identity without being
+    re-embedded on every frame.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_centroid_shift=0.5, max_missed=5,
+                 reembed_interval=30, unknown_reembed_interval=5, reembed_iou=0.5):
+        """
+        iou_threshold: minimum IoU to continue a track
+        max_centroid_shift: fallback match when the centre moved less than
+                            this fraction of the box diagonal
+        max_missed: frames a track survives without a matching detection
+        reembed_interval: frames between re-embeddings of a recognized track
+        unknown_reembed_interval: same, for tracks recognized as "Unknown"
+        reembed_iou: re-embed early when the box overlaps its last embedded
+                     box by less than this
+        """
+        self.iou_threshold = iou_threshold
+        self.max_centroid_shift = max_centroid_shift
+        self.max_missed = max_missed
+        self.reembed_interval = reembed_interval
+        self.unknown_reembed_interval = unknown_reembed_interval
+        self.reembed_iou = reembed_iou
+        self.reset()
+
+    def reset(self):
+        self.tracks = []
+        self._next_id = 1
+        self.embeddings_computed = 0
+        self.embeddings_saved = 0
+
+    def _match(self, boxes):
+        """
+        Greedy association of detections to existing tracks.
+        Returns: {detection index: track}
+        """
+        if not self.tracks or not boxes:
+            return {}
+
+        track_boxes = np.array([t.box for t in self.tracks], dtype=np.float32)
+        det_boxes = np.array(boxes, dtype=np.float32).reshape(-1, 4)
+        iou = box_iou(det_boxes, track_boxes)
+
+        matches = {}
+        used = set()
+        for d, t in zip(*np.unravel_index(np.argsort(-iou, axis=None), iou.shape)):
+            if iou[d, t] < self.iou_threshold:
+                break
+            if d in matches or t in used:
+                continue
+            matches[d] = self.tracks[t]
+            used.add(t)
+
+        # Fast movers: fall back to centroid distance for what is left
+        det_centres = (det_boxes[:, :2] + det_boxes[:, 2:]) / 2
+        track_centres = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+        diag = np.linalg.norm(track_boxes[:, 2:] - track_boxes[:, :2], axis=1) + 1e-10
+        for d in range(len(det_boxes)):
+            if d in matches:
+                continue
+            shift = np.linalg.norm(track_centres - det_centres[d], axis=1) / diag
+            for t in np.argsort(shift):
+                if shift[t] > self.max_centroid_shift:
+                    break
+                if t not in used:
+                    matches[d] = self.tracks[t]
+                    used.add(t)
+                    break
+
+        return matches
+
+    def update(self, boxes):
+        """
+        boxes: detections of the current frame
+        Returns: one Track per box, in the same order
+        """
+        boxes = [tuple(int(v) for v in box) for box in boxes]
+        matches = self._match(boxes)
+
+        matched = set()
+        result = []
+        for d, box in enumerate(boxes):
+            track = matches.get(d)
+            if track is None:
+                track = Track(self._next_id, box)
+                self._next_id += 1
+                self.tracks.append(track)
+            else:
+                track.box = box
+                track.missed = 0
+                track.frames_since_embed += 1
+            matched.add(track.id)
+            result.append(track)
+
+        for track in self.tracks:
+            if track.id not in matched:
+                track.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+
+        return result
+
+    def needs_embedding(self, track):
+        if track.name is None:
+            return True
+
+        interval = self.reembed_interval
+        if track.name == "Unknown":
+            interval = self.unknown_reembed_interval
+        if track.frames_since_embed >= interval:
+            return True
+
+        moved = box_iou([track.box], [track.embedded_box])[0, 0]
+        return moved < self.reembed_iou
+
+    def assign(self, track, name, score):
+        """
+        Record the identity computed from a fresh embedding.
+        """
+        track.name = name
+        track.score = score
+        track.embedded_box = track.box
+        track.frames_since_embed = 0
+        self.embeddings_computed += 1
+
+    def reuse(self, track):
+        """
+        Count a frame where the track's identity was reused without embedding.
+        """
+        self.embeddings_saved += 1
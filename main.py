@@ -1,10 +1,32 @@
+import argparse
 import logging
+import multiprocessing
 from ui.gui import run_gui
 
 if __name__ == "__main__":
+    # Needed for camera worker processes in the frozen EXE
+    multiprocessing.freeze_support()
+
+    parser = argparse.ArgumentParser(description="Face Recognition Attendance System")
+    parser.add_argument(
+        "--cameras",
+        help="comma-separated camera indices, e.g. 0,1,2; more than one runs a process per camera",
+    )
+    parser.add_argument(
+        "--precision",
+        choices=("fp32", "int8"),
+        default="fp32",
+        help="embedder model; int8 needs models/facenet.int8.onnx (python -m core.quantize)",
+    )
+    args = parser.parse_args()
+
     logging.basicConfig(
         filename='app.log', 
         level=logging.INFO,
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
-    run_gui()
+
+    camera_indices = None
+    if args.cameras:
+        camera_indices = [int(index) for index in args.cameras.split(",")]
+    run_gui(camera_indices, precision=args.precision)
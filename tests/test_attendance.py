@@ -0,0 +1,137 @@
+"""
+AttendanceManager against the in-memory FakeClient.
+"""
+from datetime import datetime
+import pytest
+
+pytest.importorskip("gspread")
+
+import core.attendance as attendance
+from benchmarks.fake_sheets import FakeClient, attendance_sheet
+from utils.journal import AttendanceJournal
+
+STUDENTS = ["alice", "bob", "carol"]
+
+
+@pytest.fixture
+def today():
+    return datetime.now().strftime("%d-%m-%Y")
+
+
+@pytest.fixture
+def manager(monkeypatch, today):
+    monkeypatch.setattr(attendance, "enrolled_names", lambda: list(STUDENTS))
+    client = FakeClient([attendance._half_month_sheet(today)], attendance_sheet(STUDENTS, [today]))
+    manager = attendance.AttendanceManager(
+        client=client, journal=AttendanceJournal(":memory:"), flush_interval=3600
+    )
+    # Flushes are driven by the test
+    monkeypatch.setattr(manager, "_ensure_flusher", lambda: None)
+    yield manager
+    manager.journal.close()
+
+
+def worksheet(manager, period, today):
+    spreadsheet = manager.client.open_by_key(attendance.PERIOD_SHEETS[period])
+    return spreadsheet.worksheet(attendance._half_month_sheet(today))
+
+
+def drop_date_column(sheet):
+    for row in sheet.values[1:]:
+        del row[2:]
+
+
+def add_date_column(sheet, today):
+    sheet.values[1].append(today)
+    for row in sheet.values[2:]:
+        row.append("")
+
+
+def marks(sheet):
+    return {row[1]: row[2] if len(row) > 2 else "" for row in sheet.values[2:]}
+
+
+def test_missing_date_column_only_holds_back_its_own_sheet(manager, today):
+    period_1 = worksheet(manager, "Period-1", today)
+    period_2 = worksheet(manager, "Period-2", today)
+    drop_date_column(period_2)
+
+    assert manager.start_session("Period-2")
+    assert manager.mark_attendance("bob")
+
+    assert manager.start_session("Period-1")
+    assert manager.mark_attendance("alice")
+    assert manager.mark_absent_after_session()
+
+    assert marks(period_1) == {"alice": "P", "bob": "AB", "carol": "AB"}
+    # Still journaled, not lost
+    assert manager.pending_count() == 1
+
+    manager.start_session("Period-2")
+    assert not manager.mark_absent_after_session()
+    assert manager.journal.unreconciled_sessions() == [("Period-2", today)]
+
+    add_date_column(period_2, today)
+    assert manager.flush()
+    assert manager.pending_count() == 0
+    assert marks(period_2) == {"alice": "AB", "bob": "P", "carol": "AB"}
+
+
+def test_failing_entries_do_not_block_later_batches(manager, today):
+    manager.batch_limit = 1
+    drop_date_column(worksheet(manager, "Period-2", today))
+
+    manager.start_session("Period-2")
+    manager.mark_attendance("alice")
+    manager.mark_attendance("bob")
+    manager.start_session("Period-1")
+    manager.mark_attendance("carol")
+
+    assert not manager.flush()
+    assert marks(worksheet(manager, "Period-1", today))["carol"] == "P"
+    assert manager.journal.students("Period-2", today, unsynced_only=True) == ["alice", "bob"]
+
+
+def test_revalidate_ignores_padding_of_ragged_rows(manager, today):
+    sheet = worksheet(manager, "Period-1", today)
+    # A note past the last date column: get_all_values pads every other
+    # row (headers included) with empty cells, batch_get does not
+    sheet.values[3] += ["", "transferred"]
+
+    assert manager.start_session("Period-1")
+    layout = manager.layout
+    assert layout.headers[-1] == ""
+    reads = manager.client.calls.get("get_all_values", 0)
+
+    layout.revalidate(today)
+    assert manager.client.calls.get("get_all_values", 0) == reads
+
+    # A real edit still triggers a reload
+    sheet.values[1].append("extra")
+    layout.revalidate(today)
+    assert manager.client.calls["get_all_values"] == reads + 1
+
+
+def test_absences_grow_the_grid_by_what_is_missing(monkeypatch, today):
+    # A grid with no spare rows; appends made during the session grow it
+    # server side while gspread's cached row_count stays put
+    values = attendance_sheet(["alice"], [today])
+    client = FakeClient([attendance._half_month_sheet(today)], values, grid_rows=len(values))
+    manager = attendance.AttendanceManager(
+        client=client, journal=AttendanceJournal(":memory:"), flush_interval=3600
+    )
+    monkeypatch.setattr(manager, "_ensure_flusher", lambda: None)
+    monkeypatch.setattr(attendance, "enrolled_names", lambda: ["alice", "bob", "carol", "dave"])
+
+    assert manager.start_session("Period-1")
+    manager.mark_attendance("bob")  # not on the sheet yet: appended
+    assert manager.flush()
+    assert client.appended_rows == 0
+
+    assert manager.mark_absent_after_session()
+    # carol and dave: two rows past the grid, not three
+    assert client.appended_rows == 2
+    assert marks(worksheet(manager, "Period-1", today)) == {
+        "alice": "AB", "bob": "P", "carol": "AB", "dave": "AB",
+    }
+    manager.journal.close()
@@ -0,0 +1,16 @@
+"""
+Prometheus export of the metrics registry.
+"""
+from utils.metrics import COUNT_BUCKETS, MetricsRegistry
+
+
+def test_each_histogram_keeps_its_label_key():
+    metrics = MetricsRegistry(prefix="test")
+    metrics.observe_stage("detect", 0.01)
+    metrics.observe("serial_seconds", "START", 0.2, label_key="command")
+    metrics.observe("faces_per_frame", "camera", 3, COUNT_BUCKETS)
+
+    text = metrics.to_prometheus()
+    assert 'test_stage_seconds_count{stage="detect"} 1' in text
+    assert 'test_serial_seconds_count{command="START"} 1' in text
+    assert 'test_faces_per_frame_count{source="camera"} 1' in text
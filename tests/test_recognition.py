@@ -0,0 +1,56 @@
+"""
+FaceRecognizer gallery updates and index persistence.
+"""
+import os
+import time
+import numpy as np
+
+from core.index import l2_normalize, load_index
+from core.recognition import FaceRecognizer
+
+
+def templates(seed, count=3, dim=16):
+    rng = np.random.default_rng(seed)
+    return list(l2_normalize(rng.standard_normal((count, dim)).astype(np.float32)))
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def indexed_names(path):
+    index = load_index(path)
+    return set() if index is None else set(index.entries()[0].astype(str))
+
+
+def test_changes_are_saved_in_the_background(tmp_path):
+    path = str(tmp_path / "index.npz")
+    recognizer = FaceRecognizer({"alice": templates(0)}, index_type="flat",
+                                index_path=path, save_delay=0.2)
+    assert wait_for(lambda: indexed_names(path) == {"alice"})
+
+    started = time.monotonic()
+    recognizer.add_samples("bob", np.stack(templates(1)))
+    recognizer.remove_identity("alice")
+    # Neither call waited for the write
+    assert time.monotonic() - started < 0.2
+    assert indexed_names(path) == {"alice"}
+
+    # The burst is written once the delay has passed
+    assert wait_for(lambda: indexed_names(path) == {"bob"})
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_explicit_save_writes_pending_changes(tmp_path):
+    path = str(tmp_path / "index.npz")
+    recognizer = FaceRecognizer({}, index_type="flat", index_path=path, save_delay=60)
+    recognizer.add_identity("carol", np.stack(templates(2)))
+    assert not os.path.exists(path)
+
+    recognizer.save()
+    assert indexed_names(path) == {"carol"}
@@ -0,0 +1,81 @@
+"""
+SerialController against the pty FakeArduino (POSIX only).
+"""
+import os
+import threading
+import time
+import pytest
+
+pytest.importorskip("serial")
+if os.name != "posix":
+    pytest.skip("FakeArduino needs a pty", allow_module_level=True)
+
+from benchmarks.fake_serial import FakeArduino
+from utils.serial_controller import SerialController
+
+
+@pytest.fixture
+def device():
+    device = FakeArduino()
+    yield device
+    if os.path.lexists(device.port):
+        device.unplug()
+
+
+def controller_for(device, **kwargs):
+    kwargs.setdefault("retries", 20)
+    return SerialController(port=device.port, reset_delay=0.0, reconnect_interval=0.1, **kwargs)
+
+
+def test_commands_keep_their_order_across_a_reconnect(device):
+    controller = controller_for(device)
+    try:
+        controller.send("PING").result(timeout=5)
+        device.unplug()
+
+        first = controller.send("START")
+        second = controller.send("LIGHT")
+        threading.Timer(0.5, device.replug).start()
+
+        assert first.result(timeout=10) == "ACK START"
+        assert second.result(timeout=10) == "ACK LIGHT"
+        assert device.received == ["PING", "START", "LIGHT"]
+        assert controller.reconnects >= 1
+    finally:
+        controller.close()
+
+
+def test_newer_state_command_supersedes_a_pending_one(device):
+    controller = controller_for(device)
+    try:
+        controller.send("PING").result(timeout=5)
+        device.unplug()
+
+        start = controller.send("START")
+        time.sleep(0.2)
+        stop = controller.send("STOP")
+        threading.Timer(0.5, device.replug).start()
+
+        assert stop.result(timeout=10) == "ACK STOP"
+        with pytest.raises(IOError):
+            start.result(timeout=10)
+        # The board must not end up started after the session was stopped
+        assert device.received == ["PING", "STOP"]
+    finally:
+        controller.close()
+
+
+def test_queued_state_command_is_dropped_when_superseded(device):
+    controller = controller_for(device, ack_timeout=0.3)
+    try:
+        device.silent = True  # every command waits out the ack timeout
+        busy = controller.send("PING")
+        start = controller.send("START")
+        stop = controller.send("STOP")
+
+        assert start.cancelled()
+        busy.result(timeout=5)
+        stop.result(timeout=5)
+        assert device.received == ["PING", "STOP"]
+    finally:
+        controller.close()
@@ -1,9 +1,12 @@
 import sys
 import cv2
-import numpy as np
 import threading
 import logging
-from utils.serial_controller import send_start_signal, send_stop_signal
+import time
+from utils.serial_controller import get_controller, send_start_signal, send_stop_signal
+from core.pipeline import Pipeline, PipelineStopped
+from core.tracker import FaceTracker
+from utils.metrics import registry, MetricsDumper, COUNT_BUCKETS
 
 from PySide6.QtWidgets import (
     QApplication,
@@ -20,139 +23,408 @@ from PySide6.QtWidgets import (
     QSplashScreen,
     QDialog,
     QGridLayout,
+    QSizePolicy,
 )
 
-from PySide6.QtGui import QImage, QPixmap, QFont
-from PySide6.QtCore import QThread, Signal, Qt
+from PySide6.QtGui import QImage, QPixmap, QFont, QKeySequence, QShortcut, QGuiApplication
+from PySide6.QtCore import QThread, Signal, Qt, QTimer
 
 
 # ---------------- CAMERA THREAD ---------------- #
 
 # ---------------- MODEL LOADER THREAD ---------------- #
 
+def _load_detector():
+    from core.face_detector import FaceDetector
+    return FaceDetector()
+
+
+def _load_embedder(precision):
+    from core.embedder import FaceEmbedder
+    return FaceEmbedder(precision=precision)
+
+
+def _load_embeddings():
+    from utils.storage import load_embeddings
+    return load_embeddings()
+
+
+def _load_recognizer(embeddings_db):
+    from core.recognition import FaceRecognizer
+    return FaceRecognizer(embeddings_db)
+
+
+def _load_attendance():
+    # Opens the journal only; OAuth and the period worksheets load in the
+    # background so choosing a period is a local lookup
+    from core.attendance import AttendanceManager
+    attendance = AttendanceManager()
+    attendance.start_prefetch()
+    return attendance
+
+
 class ModelLoader(QThread):
     finished_loading = Signal(object) # param: dict of components
 
+    def __init__(self, precision="fp32"):
+        super().__init__()
+        self.precision = precision  # embedder model, "fp32" or "int8"
+
+    def _timed(self, name, load, *args):
+        start = time.perf_counter()
+        component = load(*args)
+        elapsed = time.perf_counter() - start
+        registry.observe("startup_seconds", name, elapsed, label_key="component")
+        logging.info(f"Loaded {name} in {elapsed * 1000:.0f} ms")
+        return component
+
+    def _warm_up(self, components, done):
+        # Off the startup path: the menu is already showing
+        try:
+            self._timed("warm_up_detector", components['detector'].warm_up)
+            self._timed("warm_up_embedder", components['embedder'].warm_up)
+        except Exception as e:
+            logging.warning(f"Warm-up inference failed: {e}")
+        finally:
+            done.set()
+
     def run(self):
-        # Initialize heavy components here
-        # Lazy imports to speed up splash screen appearance
-        from core.face_detector import FaceDetector
-        from core.embedder import FaceEmbedder
-        from core.recognition import FaceRecognizer
-        from core.attendance import AttendanceManager
-        from utils.storage import load_embeddings
+        # Independent components load concurrently; imports stay inside the
+        # loaders so the splash screen appears before the heavy modules load
+        from concurrent.futures import ThreadPoolExecutor
 
+        start = time.perf_counter()
         components = {}
-        
-        logging.info("Loading FaceDetector...")
-        components['detector'] = FaceDetector()
-        
-        logging.info("Loading FaceEmbedder...")
-        components['embedder'] = FaceEmbedder()
-        
-        logging.info("Loading Embeddings DB...")
-        components['embeddings_db'] = load_embeddings()
-        
-        logging.info("Initializing FaceRecognizer...")
-        components['recognizer'] = FaceRecognizer(components['embeddings_db'])
-        
-        logging.info("Initializing AttendanceManager...")
-        components['attendance'] = AttendanceManager()
-        
+
+        with ThreadPoolExecutor(max_workers=4, thread_name_prefix="loader") as pool:
+            detector = pool.submit(self._timed, "detector", _load_detector)
+            embedder = pool.submit(self._timed, "embedder", _load_embedder, self.precision)
+            attendance = pool.submit(self._timed, "attendance", _load_attendance)
+
+            # The recognizer is the only component that depends on another
+            components['embeddings_db'] = self._timed("embeddings_db", _load_embeddings)
+            components['recognizer'] = self._timed(
+                "recognizer", _load_recognizer, components['embeddings_db']
+            )
+
+            components['detector'] = detector.result()
+            components['embedder'] = embedder.result()
+            components['attendance'] = attendance.result()
+
+        logging.info(f"Components ready in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        # Camera threads wait on this before their first inference
+        components['warmed_up'] = threading.Event()
+        threading.Thread(
+            target=self._warm_up,
+            args=(components, components['warmed_up']),
+            name="warm-up",
+            daemon=True,
+        ).start()
+
         self.finished_loading.emit(components)
 
 
 # ---------------- CAMERA THREAD ---------------- #
 
 class CameraThread(QThread):
-    frame_signal = Signal(np.ndarray)
+    frame_signal = Signal() # a rendered frame is waiting in take_frame()
     enrollment_finished = Signal()
+    enrollment_failed = Signal(str)
 
-    def __init__(self, components):
+    def __init__(self, components, max_batch_size=32, adaptive_detection=True):
         super().__init__()
         self.running = False
+        self.max_batch_size = max_batch_size
+        self.pipeline = None
+        self.results = []  # [(box, label, color)] from the latest recognized frame
+        self.tracker = FaceTracker()
+
+        # Live performance overlay (toggled from the window with F3)
+        self.show_overlay = False
+        self._overlay_lines = []
+        self._overlay_updated = 0.0
+        self._fps = 0.0
+        self._last_frame_time = None
+
+        # Rendering: frames are scaled and converted here, the GUI only paints
+        self.display_size = None  # (width, height) of the video label
+        self.max_display_fps = 60.0
+        self._frame_lock = threading.Lock()
+        self._latest_frame = None  # (rgb buffer, QImage over it)
+        self._shown_frame = None
+        self._last_render = 0.0
 
         self.detector = components['detector']
+        if adaptive_detection:
+            from core.face_detector import AdaptiveDetector
+            self.detector = AdaptiveDetector(self.detector)
         self.embedder = components['embedder']
         self.embeddings_db = components['embeddings_db']
         self.recognizer = components['recognizer']
         self.attendance = components['attendance']
-
-        self.recognizer = components['recognizer']
-        self.attendance = components['attendance']
+        self.warmed_up = components.get('warmed_up')
 
         from core.enrollment import Enroller
         self.enroller = Enroller(
             self.embeddings_db,
-            on_update=lambda db: self.recognizer.update_db(db),
+            on_update=self._on_enrollment_saved,
+            on_failed=self._on_enrollment_failed,
         )
 
-    def run(self):
+    def _on_enrollment_saved(self, name, templates):
+        # Runs on the enroller's save worker; only this person's gallery rows change
+        try:
+            self.recognizer.add_samples(name, templates)
+        finally:
+            # The GUI leaves the camera page on this signal, so it always goes out
+            self.enrollment_finished.emit()
+
+    def _on_enrollment_failed(self, name, reason):
+        self.enrollment_failed.emit(f"Could not enroll {name}: {reason}")
+
+    def queue_depths(self):
+        """
+        Returns: {queue_name: (items waiting, items dropped)} of the running pipeline
+        """
+        if self.pipeline is None:
+            return {}
+        return self.pipeline.depths()
+
+    def _open_camera(self):
         # Try external camera (index 1) first, then internal (index 0)
         cap = cv2.VideoCapture(1, cv2.CAP_DSHOW) # standard backend for windows
         if not cap.isOpened():
             logging.warning("External camera not found, trying default camera...")
             cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-            
+        return cap
+
+    def _capture(self, cap):
+        ret, frame = cap.read()
+        if not ret:
+            raise PipelineStopped()
+        return frame
+
+    def _detect(self, frame):
+        boxes = self.detector.detect(frame)
+        if len(boxes) > 0:
+            logging.debug(f"Faces detected: {len(boxes)}")
+        return frame, boxes
+
+    def _embed_faces(self, frame, boxes):
+        # Faces are preprocessed into the input tensor and embedded in one batch
+        return self.embedder.embed_faces(
+            frame, boxes, max_batch_size=self.max_batch_size
+        )
+
+    def _embed_and_recognize(self, item):
+        with registry.timer("recognize_stage"):
+            self._recognize_frame(*item)
+
+    def _recognize_frame(self, frame, boxes):
+        # The detector already clips boxes to the frame
+        registry.observe("faces_per_frame", "camera", len(boxes), COUNT_BUCKETS)
+
+        # Also runs on frames without a face, so a stalled enrollment ends
+        self.enroller.check_deadline()
+        if self.enroller.active:
+            results = []
+            for box, embedding in zip(boxes, self._embed_faces(frame, boxes)):
+                x1, y1, x2, y2 = box
+                self.enroller.process(embedding, face=frame[y1:y2, x1:x2])
+                results.append((box, f"Enrolling: {self.enroller.name}", (0, 0, 255)))
+
+            self.results = results
+            return
+
+        # Only new tracks, moved faces and tracks due for a refresh are embedded
+        tracks = self.tracker.update(boxes)
+        stale = [track for track in tracks if self.tracker.needs_embedding(track)]
+
+        if stale:
+            embeddings = self._embed_faces(frame, [track.box for track in stale])
+
+            # Score every face against the gallery in one matmul
+            matches = self.recognizer.recognize_batch(embeddings)
+            for track, candidates in zip(stale, matches):
+                name, score = self.recognizer.decide(candidates)
+                self.tracker.assign(track, name, score)
+                if name != "Unknown":
+                    self.attendance.mark_attendance(name)
+
+        results = []
+        for track in tracks:
+            if track not in stale:
+                self.tracker.reuse(track)
+            color = (0, 255, 0) if track.name != "Unknown" else (0, 0, 255)
+            results.append((track.box, f"{track.name} ({track.score:.2f})", color))
+
+        # Picked up by the annotation stage on the next displayed frame
+        self.results = results
+
+    def _annotate(self, frame):
+        frame = frame.copy()
+        for (x1, y1, x2, y2), label, color in self.results:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+            cv2.putText(
+                frame,
+                label,
+                (x1, y1 - 10),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.8,
+                color,
+                2,
+            )
+
+        if self.enroller.active:
+            self.enroller.draw_status(frame)
+
+        if self.show_overlay:
+            self._draw_overlay(frame)
+
+        return frame
+
+    def _render(self, frame):
+        """
+        BGR frame -> RGB QImage scaled down to fit the video label.
+        Returns: (rgb buffer, image); the image borrows the buffer
+        """
+        h, w = frame.shape[:2]
+        if self.display_size is not None:
+            target_w, target_h = self.display_size
+            scale = min(target_w / w, target_h / h)
+            if scale < 1.0:
+                w, h = max(1, int(w * scale)), max(1, int(h * scale))
+                frame = cv2.resize(frame, (w, h), interpolation=cv2.INTER_AREA)
+
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return rgb, QImage(rgb.data, w, h, 3 * w, QImage.Format_RGB888)
+
+    def _publish(self, frame):
+        rendered = self._render(frame)
+        with self._frame_lock:
+            pending = self._latest_frame is not None
+            self._latest_frame = rendered
+
+        # At most one signal is queued; later frames just replace the slot
+        if not pending:
+            self.frame_signal.emit()
+
+    def take_frame(self):
+        """
+        Returns: the newest rendered QImage, or None. Called from the GUI thread.
+        """
+        with self._frame_lock:
+            latest, self._latest_frame = self._latest_frame, None
+        if latest is None:
+            return None
+        # Keeps the borrowed buffer alive while the GUI copies it into a pixmap
+        self._shown_frame = latest
+        return latest[1]
+
+    def _update_fps(self):
+        now = time.perf_counter()
+        if self._last_frame_time is not None:
+            instant = 1.0 / max(now - self._last_frame_time, 1e-6)
+            self._fps = instant if not self._fps else 0.9 * self._fps + 0.1 * instant
+            registry.set_gauge("fps", self._fps)
+        self._last_frame_time = now
+
+    def _draw_overlay(self, frame):
+        # Percentiles are recomputed once a second, not per frame
+        now = time.monotonic()
+        if now - self._overlay_updated >= 1.0:
+            gauges = registry.gauges()
+            lines = [f"FPS {self._fps:.1f}  pending writes {gauges.get('pending_writes', 0):.0f}"]
+            faces = registry.summary("faces_per_frame").get("camera")
+            if faces:
+                lines.append(f"faces/frame p50 {faces[0]:.0f} p95 {faces[1]:.0f}")
+            depths = self.queue_depths()
+            if depths:
+                lines.append("queues " + "  ".join(
+                    f"{name} {waiting} ({dropped} dropped)" for name, (waiting, dropped) in depths.items()
+                ))
+            for stage, (p50, p95, count) in sorted(registry.summary().items()):
+                lines.append(f"{stage:<16} p50 {p50 * 1000:6.1f}ms p95 {p95 * 1000:6.1f}ms")
+            self._overlay_lines = lines
+            self._overlay_updated = now
+
+        y = frame.shape[0] - 10 - 18 * (len(self._overlay_lines) - 1)
+        for line in self._overlay_lines:
+            cv2.putText(frame, line, (10, y), cv2.FONT_HERSHEY_PLAIN, 1.0, (255, 255, 0), 1)
+            y += 18
+
+    def run(self):
+        """
+        Capture, detection, embedding/recognition and annotation run as
+        separate stages joined by latest-frame-wins queues, so the display
+        follows the camera while inference runs at its own pace.
+        """
+        if self.warmed_up is not None:
+            # The detector's net is not safe to share with the warm-up pass
+            self.warmed_up.wait()
+
+        cap = self._open_camera()
         if not cap.isOpened():
             logging.error("Error: No camera found!")
             return
 
+        self.results = []
+        self._fps = 0.0
+        self._last_frame_time = None
+        self._latest_frame = None
+        self.tracker.reset()
+        if hasattr(self.detector, 'reset'):
+            self.detector.reset()
+        pipeline = Pipeline()
+        display_q = pipeline.queue("display")
+        detect_q = pipeline.queue("detect")
+        embed_q = pipeline.queue("embed")
+
+        pipeline.add_stage("capture", lambda: self._capture(cap), outboxes=[display_q, detect_q])
+        pipeline.add_stage("detect", self._detect, inbox=detect_q, outboxes=[embed_q])
+        pipeline.add_stage("recognize", self._embed_and_recognize, inbox=embed_q)
+
+        self.pipeline = pipeline
+        for name in pipeline.queues:
+            # Read when metrics are exported; 0 once the pipeline has stopped
+            registry.set_gauge(f"queue_depth_{name}", lambda name=name: self.queue_depths().get(name, (0, 0))[0])
+            registry.set_gauge(f"queue_dropped_{name}", lambda name=name: self.queue_depths().get(name, (0, 0))[1])
         self.running = True
+        pipeline.start()
+
+        # Annotation stage runs on this thread and feeds the GUI
+        while self.running and pipeline.running:
+            frame = display_q.get(timeout=0.1)
+            if frame is None:
+                continue
+            self._update_fps()
+
+            # Frames beyond the display's refresh rate would never be seen
+            now = time.perf_counter()
+            if now - self._last_render < 1.0 / self.max_display_fps:
+                continue
+            self._last_render = now
+
+            with registry.timer("annotate"):
+                frame = self._annotate(frame)
+            with registry.timer("render"):
+                self._publish(frame)
+
+        pipeline.stop()
+        self.pipeline = None
+        cap.release()
 
-        while self.running:
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            boxes = self.detector.detect(frame)
-            if len(boxes) > 0:
-                logging.debug(f"Faces detected: {len(boxes)}")
-            else:
-                pass # logging.debug("No faces detected")
-
-            for (x1, y1, x2, y2) in boxes:
-                face = frame[y1:y2, x1:x2]
-                if face.size == 0:
-                    continue
-
-                face = cv2.resize(face, (160, 160))
-                face = np.expand_dims(face, axis=0)
-
-                embedding = self.embedder.get_embedding(face)
-
-                if self.enroller.active:
-                    self.enroller.process(embedding, frame)
-                    label = f"Enrolling: {self.enroller.name}"
-                    color = (0, 0, 255)
-                    
-                    if not self.enroller.active:
-                        self.enrollment_finished.emit()
-                else:
-                    name, score = self.recognizer.recognize(embedding)
-
-                    if name != "Unknown":
-                        self.attendance.mark_attendance(name)
-                        color = (0, 255, 0)
-                    else:
-                        color = (0, 0, 255)
-
-                    label = f"{name} ({score:.2f})"
-
-                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                cv2.putText(
-                    frame,
-                    label,
-                    (x1, y1 - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.8,
-                    color,
-                    2,
-                )
+        if hasattr(self.detector, 'detections_skipped'):
+            logging.info(
+                f"Detector ran on {self.detector.detections_run} frames, "
+                f"skipped {self.detector.detections_skipped}"
+            )
 
-            self.frame_signal.emit(frame)
-
-        cap.release()
+        computed = self.tracker.embeddings_computed
+        saved = self.tracker.embeddings_saved
+        if computed or saved:
+            logging.info(f"Tracker reused identities for {saved} of {computed + saved} faces")
 
     def stop(self):
         self.running = False
@@ -199,10 +471,16 @@ class PeriodSelectionDialog(QDialog):
 
 
 class MainWindow(QWidget):
-    def __init__(self, components):
+    def __init__(self, components, camera_indices=None):
         super().__init__()
         self.components = components
 
+        # More than one camera index switches attendance to one process per camera
+        self.camera_indices = list(camera_indices or [])
+        self.multicam = None
+        self.fps_timer = QTimer(self)
+        self.fps_timer.timeout.connect(self.update_fps_label)
+
         self.setWindowTitle("Face Recognition Attendance System")
         self.resize(900, 700)
 
@@ -244,6 +522,8 @@ class MainWindow(QWidget):
 
         self.video_label = QLabel("Camera Feed")
         self.video_label.setAlignment(Qt.AlignCenter) # Align center
+        # Frames are scaled to the label, so the pixmap must not resize it
+        self.video_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
         self.btn_stop = QPushButton("&Stop") # Alt+S
         self.btn_stop.setAutoDefault(True)
 
@@ -270,8 +550,12 @@ class MainWindow(QWidget):
 
         # Camera Thread
         self.camera_thread = CameraThread(self.components)
+        screen = QGuiApplication.primaryScreen()
+        if screen is not None and screen.refreshRate() > 0:
+            self.camera_thread.max_display_fps = screen.refreshRate()
         self.camera_thread.frame_signal.connect(self.update_image)
         self.camera_thread.enrollment_finished.connect(self.on_enrollment_finished)
+        self.camera_thread.enrollment_failed.connect(self.on_enrollment_failed)
 
         # Connections
         self.btn_take_attendance.clicked.connect(self.start_attendance)
@@ -282,6 +566,13 @@ class MainWindow(QWidget):
         
         self.is_taking_attendance = False
 
+        # F3 toggles the performance overlay on the camera view
+        self.overlay_shortcut = QShortcut(QKeySequence("F3"), self)
+        self.overlay_shortcut.activated.connect(self.toggle_overlay)
+
+    def toggle_overlay(self):
+        self.camera_thread.show_overlay = not self.camera_thread.show_overlay
+
     def start_attendance(self):
         dialog = PeriodSelectionDialog(self)
         if dialog.exec():
@@ -294,15 +585,37 @@ class MainWindow(QWidget):
                     QMessageBox.warning(self, "Error", f"Sheet '{period}' not found in Google Sheets!")
                     return
 
-            # Trigger motor in background to not block UI
+                # This class's students are matched first; anyone else falls back to the full gallery
+                self.camera_thread.recognizer.set_roster(self.camera_thread.attendance.roster())
+
+            # Queued to the serial controller; does not block the UI
             self.is_taking_attendance = True
-            threading.Thread(target=send_start_signal, daemon=True).start()
+            send_start_signal()
 
             self.stack.setCurrentWidget(self.page_camera)
             self.btn_stop.setVisible(True)
-            if not self.camera_thread.isRunning():
+
+            if len(self.camera_indices) > 1:
+                from core.multicam import MultiCameraManager
+                self.multicam = MultiCameraManager(
+                    self.camera_thread.recognizer,
+                    self.camera_thread.attendance,
+                    self.camera_indices,
+                    precision=self.camera_thread.embedder.precision,
+                )
+                self.multicam.start()
+                self.video_label.setText("Starting cameras...")
+                self.fps_timer.start(1000)
+            elif not self.camera_thread.isRunning():
                 self.camera_thread.start()
 
+    def update_fps_label(self):
+        if self.multicam is None:
+            return
+        lines = [f"Camera {index}: {fps:.1f} FPS" for index, fps in self.multicam.fps.items()]
+        lines += [f"Camera {index}: {error}" for index, error in self.multicam.errors.items()]
+        self.video_label.setText("\n".join(lines))
+
     def start_enrollment(self):
         name, ok = QInputDialog.getText(
             self,
@@ -321,11 +634,17 @@ class MainWindow(QWidget):
     def stop_camera(self):
         if self.camera_thread.isRunning():
             self.camera_thread.stop()
+
+        if self.multicam is not None:
+            self.fps_timer.stop()
+            self.multicam.stop()
+            self.multicam = None
             
         if getattr(self, 'is_taking_attendance', False):
             if hasattr(self.camera_thread, 'attendance'):
                 threading.Thread(target=self.camera_thread.attendance.mark_absent_after_session, daemon=True).start()
-            threading.Thread(target=send_stop_signal, daemon=True).start()
+            send_stop_signal()
+            self.camera_thread.recognizer.set_roster(None)
             self.is_taking_attendance = False
 
         self.stack.setCurrentWidget(self.page_menu)
@@ -337,6 +656,10 @@ class MainWindow(QWidget):
         QMessageBox.information(self, "Enrollment", "Enrollment Complete!")
         # Update logic after enrollment if needed (e.g. if we were on manage page, but we aren't)
 
+    def on_enrollment_failed(self, message):
+        self.stop_camera()
+        QMessageBox.warning(self, "Enrollment", message)
+
     def open_manage_page(self):
         self.stack.setCurrentWidget(self.page_manage)
         self.load_students()
@@ -372,40 +695,37 @@ class MainWindow(QWidget):
         )
 
         if reply == QMessageBox.Yes:
-            from utils.storage import save_embeddings
+            from utils.storage import delete_embeddings
             if name in self.camera_thread.embeddings_db:
                 del self.camera_thread.embeddings_db[name]
-                save_embeddings(self.camera_thread.embeddings_db)
-                self.camera_thread.recognizer.update_db(self.camera_thread.embeddings_db)
+                delete_embeddings(name)
+                self.camera_thread.recognizer.remove_identity(name)
                 self.load_students()
                 QMessageBox.information(self, "Deleted", f"Removed {name}")
 
     def go_back_to_menu(self):
         self.stack.setCurrentWidget(self.page_menu)
 
-    def update_image(self, frame):
-        rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_image.shape
-        bytes_per_line = ch * w
-
-        qt_image = QImage(
-            rgb_image.data,
-            w,
-            h,
-            bytes_per_line,
-            QImage.Format_RGB888,
-        )
+    def update_image(self):
+        # The camera thread already converted and scaled the frame
+        self.camera_thread.display_size = (self.video_label.width(), self.video_label.height())
+        qt_image = self.camera_thread.take_frame()
+        if qt_image is None:
+            return
 
         self.video_label.setPixmap(QPixmap.fromImage(qt_image))
 
     def closeEvent(self, event):
         self.stop_camera()
+        # Write any attendance still waiting in the queue before exiting
+        if hasattr(self.camera_thread, 'attendance'):
+            self.camera_thread.attendance.close()
         event.accept()
 
 
 # ---------------- ENTRY ---------------- #
 
-def run_gui():
+def run_gui(camera_indices=None, precision="fp32"):
     app = QApplication(sys.argv)
 
     # --- Loading Screen (Splash) ---
@@ -439,13 +759,22 @@ def run_gui():
     refs = {}
 
     def start_app(components):
-        window = MainWindow(components)
+        window = MainWindow(components, camera_indices)
         window.show()
         refs['window'] = window # Keep reference
         splash.finish(window)
 
+    # Stage timings are written to data/metrics.prom in Prometheus text format
+    metrics_dumper = MetricsDumper()
+    metrics_dumper.start()
+    app.aboutToQuit.connect(metrics_dumper.stop)
+
+    # Open the Arduino port now so its reset is over before the first session
+    serial_controller = get_controller()
+    app.aboutToQuit.connect(serial_controller.close)
+
     # Start Loader
-    loader = ModelLoader()
+    loader = ModelLoader(precision)
     loader.finished_loading.connect(start_app)
     loader.start()
     
@@ -0,0 +1,123 @@
+import os
+import sqlite3
+import threading
+import time
+from utils.paths import JOURNAL_PATH
+
+
+class AttendanceJournal:
+    """
+    Durable local record of every attendance mark, written before any
+    network call. Entries stay "unsynced" until the Sheets backend has
+    accepted them, so nothing is lost if the network drops or the app exits.
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        # Survive power loss in WAL mode with one fsync per commit
+        self._conn.execute("PRAGMA synchronous=FULL")
+
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS marks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                period TEXT NOT NULL,
+                date TEXT NOT NULL,
+                student TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created REAL NOT NULL,
+                synced INTEGER NOT NULL DEFAULT 0,
+                UNIQUE (period, date, student)
+            );
+            CREATE INDEX IF NOT EXISTS marks_unsynced ON marks (synced, id);
+
+            CREATE TABLE IF NOT EXISTS sessions (
+                period TEXT NOT NULL,
+                date TEXT NOT NULL,
+                closed REAL NOT NULL,
+                reconciled INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (period, date)
+            );
+            """
+        )
+
+    def record(self, period, date_str, student_name, status="P"):
+        """
+        Returns: True if this is a new mark, False if it was already journaled
+        """
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO marks (period, date, student, status, created) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (period, date_str, student_name, status, time.time()),
+            )
+            return cur.rowcount > 0
+
+    def unsynced(self, limit=500, after_id=0):
+        """
+        after_id: only entries journaled after this one (to page past
+                  entries that could not be synced)
+        Returns: list of (id, period, date, student, status), oldest first
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, period, date, student, status FROM marks "
+                "WHERE synced = 0 AND id > ? ORDER BY id LIMIT ?",
+                (after_id, limit),
+            ).fetchall()
+
+    def unsynced_count(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM marks WHERE synced = 0"
+            ).fetchone()[0]
+
+    def mark_synced(self, ids):
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE marks SET synced = 1 WHERE id = ?", [(i,) for i in ids]
+            )
+
+    def students(self, period, date_str, unsynced_only=False):
+        query = "SELECT student FROM marks WHERE period = ? AND date = ?"
+        if unsynced_only:
+            query += " AND synced = 0"
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query, (period, date_str))]
+
+    def close_session(self, period, date_str):
+        """
+        Record that a session ended and still needs absences reconciled.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sessions (period, date, closed) VALUES (?, ?, ?)",
+                (period, date_str, time.time()),
+            )
+
+    def unreconciled_sessions(self):
+        """
+        Returns: list of (period, date) closed but not yet reconciled
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT period, date FROM sessions WHERE reconciled = 0 ORDER BY closed"
+            ).fetchall()
+
+    def mark_reconciled(self, period, date_str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sessions SET reconciled = 1 WHERE period = ? AND date = ?",
+                (period, date_str),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,182 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+from utils.paths import METRICS_PATH
+
+# Upper bounds in seconds for stage latency histograms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Upper bounds for faces-per-frame
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+
+
+class Histogram:
+    """
+    Cumulative Prometheus-style buckets plus a rolling window of recent
+    samples for live percentiles.
+    """
+
+    def __init__(self, buckets, window=512):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def percentile(self, q):
+        if not self.recent:
+            return 0.0
+        return float(np.percentile(self.recent, q))
+
+
+class MetricsRegistry:
+    """
+    Process-wide store of stage timings, value histograms and gauges.
+    Recording is a lock plus a few list updates, cheap enough for the
+    per-frame hot path.
+    """
+
+    def __init__(self, prefix="face_attendance"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}  # {(metric, label): Histogram}
+        self._label_keys = {}  # {metric: Prometheus label name}
+        self._gauges = {}      # {name: value or callable}
+
+    def observe(self, metric, label, value, buckets=LATENCY_BUCKETS, label_key="source"):
+        """
+        label_key: Prometheus label name for this metric's labels, fixed by
+                   the metric's first observation
+        """
+        with self._lock:
+            hist = self._histograms.get((metric, label))
+            if hist is None:
+                hist = self._histograms[(metric, label)] = Histogram(buckets)
+                self._label_keys.setdefault(metric, label_key)
+            hist.observe(value)
+
+    def observe_stage(self, stage, seconds):
+        self.observe("stage_seconds", stage, seconds, label_key="stage")
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start)
+
+    def set_gauge(self, name, value):
+        """
+        value: a number, or a callable evaluated when metrics are read
+        """
+        with self._lock:
+            self._gauges[name] = value
+
+    def gauges(self):
+        with self._lock:
+            gauges = dict(self._gauges)
+        values = {}
+        for name, value in gauges.items():
+            try:
+                values[name] = float(value() if callable(value) else value)
+            except Exception as e:
+                logging.debug(f"Gauge {name} unavailable: {e}")
+        return values
+
+    def summary(self, metric="stage_seconds"):
+        """
+        Returns: {label: (p50, p95, count)} over the rolling window
+        """
+        with self._lock:
+            return {
+                label: (hist.percentile(50), hist.percentile(95), hist.total)
+                for (name, label), hist in self._histograms.items() if name == metric
+            }
+
+    def totals(self, metric="stage_seconds"):
+        """
+        Returns: {label: (count, sum)} since start; unlike percentiles these
+        can be added up across processes
+        """
+        with self._lock:
+            return {
+                label: (hist.total, hist.sum)
+                for (name, label), hist in self._histograms.items() if name == metric
+            }
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            by_metric = {}
+            for (metric, label), hist in histograms:
+                by_metric.setdefault(metric, []).append((label, hist))
+
+            for metric, entries in by_metric.items():
+                name = f"{self.prefix}_{metric}"
+                tag = self._label_keys[metric]
+                lines.append(f"# TYPE {name} histogram")
+                for label, hist in entries:
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{tag}="{label}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_bucket{{{tag}="{label}",le="+Inf"}} {hist.total}')
+                    lines.append(f'{name}_sum{{{tag}="{label}"}} {hist.sum}')
+                    lines.append(f'{name}_count{{{tag}="{label}"}} {hist.total}')
+
+        for gauge, value in sorted(self.gauges().items()):
+            name = f"{self.prefix}_{gauge}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path=METRICS_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+# Shared by the camera loop, detector, embedder, recognizer and attendance manager
+registry = MetricsRegistry()
+
+
+class MetricsDumper(threading.Thread):
+    """
+    Periodically writes the registry to a Prometheus text file.
+    """
+
+    def __init__(self, path=METRICS_PATH, interval=15.0, metrics=registry):
+        super().__init__(daemon=True)
+        self.path = path
+        self.interval = interval
+        self.metrics = metrics
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.metrics.dump(self.path)
+            except Exception as e:
+                logging.error(f"Error writing metrics: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.metrics.dump(self.path)
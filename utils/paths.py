@@ -17,4 +17,9 @@ MODEL = os.path.join(
 )
 
 DATA_DIR = os.path.join(BASE_DIR, "data")
-EMBEDDINGS_PATH = os.path.join(DATA_DIR, "embeddings.pkl")
\ No newline at end of file
+EMBEDDINGS_PATH = os.path.join(DATA_DIR, "embeddings.pkl")  # legacy pickle, migrated on first load
+EMBEDDINGS_DIR = os.path.join(DATA_DIR, "embeddings")
+CROPS_DIR = os.path.join(DATA_DIR, "enrollment_crops")  # 160x160 faces, for quantization calibration
+INDEX_PATH = os.path.join(DATA_DIR, "gallery_index.npz")
+JOURNAL_PATH = os.path.join(DATA_DIR, "attendance_journal.db")
+METRICS_PATH = os.path.join(DATA_DIR, "metrics.prom")
@@ -1,41 +1,249 @@
 import serial
 import serial.tools.list_ports
 import time
+import queue
 import logging
+import threading
+from concurrent.futures import Future
+from utils.metrics import registry
 
-def find_arduino_port():
+ARDUINO_HWID = "2341:0043"
+STATE_COMMANDS = {"START", "STOP"}  # later ones supersede earlier ones
+
+
+def find_arduino_port(hwid=ARDUINO_HWID):
     ports = serial.tools.list_ports.comports()
     for port in ports:
-        if "2341:0043" in port.hwid:
+        if hwid in port.hwid:
             return port.device
     return None
 
-def send_start_signal():
-    port = find_arduino_port()
-    if port is None:
-        logging.warning("Arduino not found.")
-    else:
-        logging.info(f"Arduino found on {port}")
+
+class SerialController:
+    """
+    Long-lived connection to the Arduino. The port is discovered and opened
+    once (the board resets on open), then kept open; commands go through a
+    queue drained by a worker thread, so callers never block on the serial
+    line. A lost connection is reopened, rediscovering the port if needed.
+    """
+
+    def __init__(self, port=None, baudrate=9600, hwid=ARDUINO_HWID, reset_delay=2.0,
+                 ack_timeout=1.0, require_ack=False, retries=2, reconnect_interval=2.0):
+        """
+        port: device path; None discovers the board by hwid (also used for
+              a pty in tests)
+        reset_delay: seconds to wait after opening, while the board reboots
+        ack_timeout: seconds to wait for the board's reply line ("ACK ...")
+        require_ack: treat a missing reply as a failure and resend; the
+                     stock sketch does not reply, so by default a timeout is
+                     only counted
+        retries: extra attempts per command after an error; a command is
+                 retried in place, ahead of anything queued after it
+        reconnect_interval: seconds between reconnect attempts
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self.hwid = hwid
+        self.reset_delay = reset_delay
+        self.ack_timeout = ack_timeout
+        self.require_ack = require_ack
+        self.retries = retries
+        self.reconnect_interval = reconnect_interval
+
+        self._fixed_port = port is not None
+        self._serial = None
+        self._open_failed = False  # warn once per outage, not every retry
+        self._commands = queue.Queue()
+        self._state_lock = threading.Lock()
+        self._latest_state = None  # Future of the newest START/STOP
+        self._stop_event = threading.Event()
+
+        # Metrics
+        self.commands_sent = 0
+        self.ack_timeouts = 0
+        self.reconnects = 0
+        self.last_latency = 0.0
+
+        registry.set_gauge("serial_connected", lambda: 1 if self.connected else 0)
+        registry.set_gauge("serial_queue_depth", self._commands.qsize)
+
+        self._worker = threading.Thread(target=self._run, name="serial-controller", daemon=True)
+        self._worker.start()
+
+    @property
+    def connected(self):
+        return self._serial is not None
+
+    def send(self, command):
+        """
+        Queue a command line (e.g. "START") and return immediately.
+        A START/STOP still waiting in the queue is cancelled by a newer
+        one: only the latest board state matters.
+        Returns: Future resolved with the board's reply (None without one),
+        failed when every attempt errored, or cancelled when superseded
+        """
+        future = Future()
+        if command in STATE_COMMANDS:
+            with self._state_lock:
+                previous, self._latest_state = self._latest_state, future
+            if previous is not None and previous.cancel():
+                logging.info(f"Dropped a queued state command, superseded by {command}")
+        self._commands.put((command, future))
+        return future
+
+    def close(self, timeout=5.0):
+        """
+        Send what is still queued, then close the port.
+        """
+        self._stop_event.set()
+        self._commands.put(None)
+        self._worker.join(timeout)
+
+    # ---- worker ----
+
+    def _connect(self):
+        if not self._fixed_port:
+            # Rescan only when (re)connecting; the device name can change on replug
+            self.port = find_arduino_port(self.hwid)
+        if self.port is None:
+            return False
+
         try:
-            with serial.Serial(port, 9600, timeout=1) as ser:
-                time.sleep(2)  # Allow reset
-                ser.write(b"START\n")
-                ser.flush()
-                logging.info("Sent START command")
-        except Exception as e:
-            logging.error(f"Error sending START: {e}")
+            ser = serial.Serial(self.port, self.baudrate, timeout=self.ack_timeout)
+        except (serial.SerialException, OSError) as e:
+            if not self._open_failed:
+                logging.warning(f"Cannot open Arduino port {self.port}: {e}")
+            self._open_failed = True
+            return False
+
+        time.sleep(self.reset_delay)  # Allow reset
+        ser.reset_input_buffer()
+        self._serial = ser
+        self._open_failed = False
+        logging.info(f"Arduino connected on {self.port}")
+        return True
+
+    def _disconnect(self):
+        if self._serial is not None:
+            try:
+                self._serial.close()
+            except Exception:
+                pass
+            self._serial = None
+
+    def _exchange(self, command):
+        """
+        Write one command and wait for the reply line.
+        Returns: (reply or None, seconds until the reply or timeout)
+        """
+        start = time.perf_counter()
+        self._serial.write(command.encode() + b"\n")
+        self._serial.flush()
+        reply = self._serial.readline().decode(errors="replace").strip() or None
+        return reply, time.perf_counter() - start
+
+    def _superseded(self, command, future):
+        return command in STATE_COMMANDS and self._latest_state is not future
+
+    def _handle(self, command, future):
+        """
+        Send one command, reconnecting and resending in place until it goes
+        through, so commands reach the board in the order they were queued.
+        """
+        if not future.set_running_or_notify_cancel():
+            return  # superseded while queued
+
+        reason = None
+        for attempt in range(self.retries + 1):
+            if attempt and (self._stop_event.wait(self.reconnect_interval)
+                            or self._superseded(command, future)):
+                # Closing, or a newer START/STOP makes this one moot
+                break
+
+            if not self.connected and not self._connect():
+                reason = "Arduino not found."
+                continue
+
+            try:
+                reply, latency = self._exchange(command)
+            except (serial.SerialException, OSError) as e:
+                # Unplugged or reset under us: reopen and resend
+                logging.warning(f"Serial error sending {command}: {e}")
+                self._disconnect()
+                self.reconnects += 1
+                reason = str(e)
+                continue
+
+            self.commands_sent += 1
+            self.last_latency = latency
+            registry.observe("serial_seconds", command, latency, label_key="command")
+
+            if reply is None:
+                self.ack_timeouts += 1
+                if self.require_ack:
+                    reason = f"no reply to {command}"
+                    continue
+                logging.info(f"Sent {command} command")
+            else:
+                logging.info(f"Sent {command} command, board replied {reply!r} in {latency * 1000:.0f} ms")
+            future.set_result(reply)
+            return
+
+        if self._superseded(command, future):
+            reason = f"superseded by a newer command ({reason})"
+        logging.error(f"Error sending {command}: {reason}")
+        future.set_exception(IOError(reason))
+
+    def _check_connection(self):
+        # Idle tick: notice an unplug or reconnect before the next command
+        if self.connected:
+            try:
+                waiting = self._serial.in_waiting
+                if waiting:
+                    # Unsolicited output (e.g. a late ACK) must not pair with the next command
+                    self._serial.read(waiting)
+            except (serial.SerialException, OSError) as e:
+                logging.warning(f"Arduino disconnected: {e}")
+                self._disconnect()
+                self.reconnects += 1
+        else:
+            self._connect()
+
+    def _run(self):
+        self._connect()
+        while True:
+            try:
+                item = self._commands.get(timeout=self.reconnect_interval)
+            except queue.Empty:
+                if self._stop_event.is_set():
+                    break
+                self._check_connection()
+                continue
+
+            if item is None:
+                if self._commands.empty():
+                    break
+                continue
+            self._handle(*item)
+
+        self._disconnect()
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_controller():
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = SerialController()
+        return _controller
+
+
+def send_start_signal():
+    return get_controller().send("START")
+
 
 def send_stop_signal():
-    port = find_arduino_port()
-    if port is None:
-        logging.warning("Arduino not found.")
-    else:
-        logging.info(f"Arduino found on {port}")
-        try:
-            with serial.Serial(port, 9600, timeout=1) as ser:
-                time.sleep(2)  # Allow reset
-                ser.write(b"STOP\n")
-                ser.flush()
-                logging.info("Sent STOP command")
-        except Exception as e:
-            logging.error(f"Error sending STOP: {e}")
+    return get_controller().send("STOP")
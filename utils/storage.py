@@ -1,16 +1,351 @@
 import os
+import json
 import pickle
-from utils.paths import DATA_DIR, EMBEDDINGS_PATH
+import logging
+import threading
+from urllib.parse import quote, unquote
+import numpy as np
+from utils.paths import DATA_DIR, EMBEDDINGS_PATH, EMBEDDINGS_DIR, CROPS_DIR
+
+STORE_VERSION = 1
+MIN_CAPACITY = 256
+
+
+class EmbeddingStore:
+    """
+    Enrollment embeddings on disk as one contiguous float32 .npy matrix,
+    opened memory-mapped, plus a small JSON index mapping each person to
+    their row ranges.
+
+    Enrollment appends rows in place; deletion drops the person from the
+    index (their rows become tombstones) and the matrix is compacted once
+    too many rows are dead. The index is the commit point and is replaced
+    atomically, so a crash never leaves a half-written gallery.
+    """
+
+    def __init__(self, directory=EMBEDDINGS_DIR, legacy_path=EMBEDDINGS_PATH):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        self._lock = threading.RLock()
+        self._matrix = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._index = self._read_index()
+        if self._index is None:
+            self._index = {
+                "version": STORE_VERSION,
+                "generation": 0,
+                "dim": None,
+                "rows": 0,      # rows written, live or dead
+                "capacity": 0,  # rows allocated in the data file
+                "dead": 0,      # tombstoned rows
+                "people": {},   # {name: [[start, count], ...]}
+            }
+            if legacy_path and os.path.exists(legacy_path):
+                self._migrate(legacy_path)
+        self._remove_stale_files()
+
+    # ---- files ----
+
+    def _data_path(self, generation=None):
+        if generation is None:
+            generation = self._index["generation"]
+        return os.path.join(self.directory, f"vectors-{generation}.npy")
+
+    def _read_index(self):
+        if not os.path.exists(self.index_path):
+            return None
+        with open(self.index_path, "r") as f:
+            index = json.load(f)
+        if index.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported embedding store version: {index.get('version')}")
+        return index
+
+    def _write_index(self, index):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+        self._index = index
+
+    def _remove_stale_files(self):
+        current = os.path.basename(self._data_path())
+        for filename in os.listdir(self.directory):
+            if filename.startswith("vectors-") and filename != current:
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except OSError:
+                    pass  # Still mapped by a reader (Windows); retried next start
+
+    def _open(self):
+        if self._matrix is None and self._index["capacity"]:
+            self._matrix = np.load(self._data_path(), mmap_mode="r")
+        return self._matrix
+
+    def _rewrite(self, entries, capacity):
+        """
+        Write live entries [(name, vectors)] contiguously into a new data
+        file generation and commit it with the index.
+        """
+        dim = self._index["dim"]
+        generation = self._index["generation"] + 1
+        path = self._data_path(generation)
+
+        matrix = np.lib.format.open_memmap(
+            path, mode="w+", dtype=np.float32, shape=(max(capacity, MIN_CAPACITY), dim)
+        )
+        people = {}
+        row = 0
+        for name, vectors in entries:
+            matrix[row:row + len(vectors)] = vectors
+            people[name] = [[row, len(vectors)]]
+            row += len(vectors)
+        matrix.flush()
+        del matrix
+
+        old_path = self._data_path()
+        self._write_index({
+            "version": STORE_VERSION,
+            "generation": generation,
+            "dim": dim,
+            "rows": row,
+            "capacity": max(capacity, MIN_CAPACITY),
+            "dead": 0,
+            "people": people,
+        })
+
+        self._matrix = None
+        if os.path.exists(old_path):
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+    def _migrate(self, legacy_path):
+        """
+        One-time import of the old pickled {name: [ndarray, ...]} file.
+        """
+        with open(legacy_path, "rb") as f:
+            data = pickle.load(f)
+
+        entries = [
+            (name, np.asarray(embeddings, dtype=np.float32))
+            for name, embeddings in data.items() if len(embeddings)
+        ]
+        if entries:
+            self._index["dim"] = int(entries[0][1].shape[1])
+            self._rewrite(entries, capacity=2 * sum(len(v) for _, v in entries))
+        else:
+            self._write_index(self._index)
+
+        os.replace(legacy_path, legacy_path + ".migrated")
+        logging.info(f"Migrated {len(entries)} people from {legacy_path}")
+
+    # ---- reads ----
+
+    def names(self):
+        with self._lock:
+            return list(self._index["people"])
+
+    def get(self, name):
+        """
+        Returns: (count, dim) read-only array of a person's embeddings
+        """
+        with self._lock:
+            ranges = self._index["people"].get(name)
+            if not ranges:
+                return np.empty((0, self._index["dim"] or 0), dtype=np.float32)
+            matrix = self._open()
+            parts = [matrix[start:start + count] for start, count in ranges]
+            return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def as_dict(self):
+        with self._lock:
+            return {name: self.get(name) for name in self._index["people"]}
+
+    # ---- writes ----
+
+    def add(self, name, vectors):
+        """
+        Append embeddings for a person (new or existing).
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors = vectors.reshape(len(vectors), -1)
+        if len(vectors) == 0:
+            return
+
+        with self._lock:
+            index = json.loads(json.dumps(self._index))
+            if index["dim"] is None:
+                index["dim"] = int(vectors.shape[1])
+                self._index["dim"] = index["dim"]
+            elif vectors.shape[1] != index["dim"]:
+                raise ValueError(f"Embedding size {vectors.shape[1]} does not match store ({index['dim']})")
+
+            start = index["rows"]
+            if start + len(vectors) > index["capacity"]:
+                # Grow (and compact) into a new generation with room to spare
+                live = self._live_entries()
+                live_rows = sum(len(v) for _, v in live) + len(vectors)
+                self._rewrite(live, capacity=2 * live_rows)
+                index = json.loads(json.dumps(self._index))
+                start = index["rows"]
+
+            matrix = np.lib.format.open_memmap(self._data_path(), mode="r+")
+            matrix[start:start + len(vectors)] = vectors
+            matrix.flush()
+            del matrix
+
+            ranges = index["people"].setdefault(name, [])
+            if ranges and ranges[-1][0] + ranges[-1][1] == start:
+                ranges[-1][1] += len(vectors)
+            else:
+                ranges.append([start, len(vectors)])
+            index["rows"] = start + len(vectors)
+
+            # Rows past the old count only become visible once this lands
+            self._write_index(index)
+
+    def remove(self, name):
+        """
+        Tombstone a person's rows; compacts when dead rows dominate.
+        """
+        with self._lock:
+            if name not in self._index["people"]:
+                return
+            index = json.loads(json.dumps(self._index))
+            ranges = index["people"].pop(name)
+            index["dead"] += sum(count for _, count in ranges)
+            self._write_index(index)
+
+            live = index["rows"] - index["dead"]
+            if index["dead"] > max(live, MIN_CAPACITY):
+                self.compact()
+
+    def replace(self, name, vectors):
+        with self._lock:
+            self.remove(name)
+            self.add(name, vectors)
+
+    def _live_entries(self):
+        return [(name, np.array(self.get(name))) for name in self._index["people"]]
+
+    def compact(self):
+        """
+        Rewrite the data file without tombstoned rows.
+        """
+        with self._lock:
+            if self._index["dim"] is None:
+                return
+            live = self._live_entries()
+            self._rewrite(live, capacity=2 * sum(len(v) for _, v in live))
+
+    def sync(self, data):
+        """
+        Bring the store in line with a full {name: [ndarray, ...]} dict,
+        touching only people whose embeddings changed.
+        """
+        with self._lock:
+            for name in self.names():
+                if name not in data or len(data[name]) == 0:
+                    self.remove(name)
+
+            for name, embeddings in data.items():
+                if len(embeddings) == 0:
+                    continue
+                stored = self.get(name)
+                embeddings = np.asarray(embeddings, dtype=np.float32)
+                if len(embeddings) == len(stored) and np.array_equal(embeddings, stored):
+                    continue
+                if len(embeddings) > len(stored) and np.array_equal(embeddings[:len(stored)], stored):
+                    self.add(name, embeddings[len(stored):])
+                else:
+                    self.replace(name, embeddings)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EmbeddingStore()
+        return _store
+
 
 def load_embeddings():
+    """
+    Returns: {name: (count, dim) array}, memory-mapped from disk
+    """
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
+    return get_store().as_dict()
 
-    if os.path.exists(EMBEDDINGS_PATH):
-        with open(EMBEDDINGS_PATH, "rb") as f:
-            return pickle.load(f)
-    return {}
 
 def save_embeddings(data):
-    with open(EMBEDDINGS_PATH, "wb") as f:
-        pickle.dump(data, f)
+    get_store().sync(data)
+
+
+def append_embeddings(name, vectors):
+    """
+    Append one person's new samples.
+    Returns: all of that person's embeddings
+    """
+    store = get_store()
+    store.add(name, vectors)
+    return store.get(name)
+
+
+def delete_embeddings(name):
+    get_store().remove(name)
+    delete_enrollment_crops(name)
+
+
+def enrolled_names():
+    return get_store().names()
+
+
+# ---- enrollment crops ----
+
+def _crops_path(name, directory=CROPS_DIR):
+    # Percent-encoded so any student ID is a valid file name
+    return os.path.join(directory, quote(name, safe="") + ".npy")
+
+
+def save_enrollment_crops(name, crops, directory=CROPS_DIR):
+    """
+    Append one person's (n, 160, 160, 3) uint8 face crops.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = _crops_path(name, directory)
+    crops = np.asarray(crops, dtype=np.uint8)
+    if os.path.exists(path):
+        crops = np.concatenate([np.load(path), crops])
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, crops)
+    os.replace(tmp_path, path)
+
+
+def load_enrollment_crops(directory=CROPS_DIR):
+    """
+    Returns: {name: (n, 160, 160, 3) uint8 array}
+    """
+    if not os.path.isdir(directory):
+        return {}
+    crops = {}
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".npy"):
+            crops[unquote(filename[:-4])] = np.load(os.path.join(directory, filename))
+    return crops
+
+
+def delete_enrollment_crops(name, directory=CROPS_DIR):
+    path = _crops_path(name, directory)
+    if os.path.exists(path):
+        os.remove(path)